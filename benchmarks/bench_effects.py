@@ -0,0 +1,111 @@
+import random
+
+import pygame
+
+from benchmarks.common import get_game, measure, SEED
+from scripts.particle import ParticleSystem, PARTICLE_TYPES
+
+PARTICLE_COUNT = 500
+WEATHER_TYPES = ['clear', 'rain', 'thunderstorm', 'snow']
+# Level with torches, lamps and a bonfire
+LIT_LEVEL = 'levels/test_level_2/test_level_2.tmx'
+
+
+def bench_particles(game):
+    rng = random.Random(SEED)
+    scroll = game.render_scroll
+    width, height = game.display.get_size()
+
+    def spawn():
+        game.particles = ParticleSystem(game)
+        for _ in range(PARTICLE_COUNT):
+            game.particles.add(rng.choice(PARTICLE_TYPES), (scroll[0] + rng.random() * width, scroll[1] + rng.random() * height),
+                               velocity=[0, -0.2], frame=rng.randint(0, 10))
+        # Particles are always updated once before they are rendered, clamping their starting frame
+        game.particles.update()
+
+    def update():
+        game.particles.update()
+
+    def render():
+        game.particles.render(game.display, offset=scroll)
+
+    return {
+        'particles/update_x' + str(PARTICLE_COUNT): measure(update, repeat=5, setup=spawn),
+        'particles/render_x' + str(PARTICLE_COUNT): measure(render, repeat=5, setup=spawn),
+    }
+
+
+def bench_weather(game):
+    results = {}
+    weather = game.weather_system
+    for weather_type in WEATHER_TYPES:
+        weather.change_weather(weather_type)
+        results['weather/update_' + weather_type] = measure(weather.update, repeat=5, number=60)
+        results['weather/render_' + weather_type] = measure(lambda: weather.render(game.display), repeat=5, number=60)
+    return results
+
+
+def bench_menu_text(game):
+    """
+    The digit and letter glyphs the upgrade and inventory screens draw every frame, on a window sized surface.
+    """
+    screen = pygame.Surface((720, 600))
+    ui = game.ui
+    player = game.player
+
+    def render():
+        ui.render_next_level(screen, player.level)
+        ui.render_health(screen, player)
+        ui.render_stamina(screen, player)
+        ui.render_mana(screen, player)
+        ui.render_weapon_name_stats(screen, player, player.equipped_weapon)
+        ui.render_spell_name_stats(screen, player, player.equipped_spell)
+
+    return {'ui/menu_text': measure(render, repeat=5, number=60)}
+
+
+def bench_hud(game):
+    """
+    The in game HUD: attribute bars, equipped cards and the soul counter.
+    """
+    ui = game.ui
+
+    def render():
+        ui.render(game.display, (0, 0))
+
+    return {'ui/hud': measure(render, repeat=5, number=200)}
+
+
+def bench_night_overlay(game):
+    """
+    The night overlay on a level with lights: the camera standing still, and the opacity changing every frame (dusk).
+    """
+    game.load_level(LIT_LEVEL)
+    game.step()
+    scroll = game.render_scroll
+    weather = game.weather_system
+    weather.night_overlay_opacity = 150
+
+    def fading():
+        weather.night_overlay_opacity = 100 if weather.night_overlay_opacity == 150 else 150
+        game.render_night_overlay(scroll)
+
+    return {
+        'night_overlay/still': measure(lambda: game.render_night_overlay(scroll), repeat=5, number=200),
+        'night_overlay/fading': measure(fading, repeat=5, number=200),
+    }
+
+
+def run():
+    game = get_game()
+    game.load_level()
+    game.step()
+    results = {}
+    results.update(bench_particles(game))
+    results.update(bench_weather(game))
+    results.update(bench_menu_text(game))
+    results.update(bench_hud(game))
+    # Loads another level, keep it last
+    results.update(bench_night_overlay(game))
+    return results
@@ -0,0 +1,77 @@
+import random
+
+from benchmarks.common import get_game, measure, walkable_tiles, SEED
+from scripts.entities import Enemy
+from scripts import utils
+
+ENEMY_COUNTS = [0, 10, 100, 500]
+
+# Skeletons are spread over the walkable tiles within this many tiles of the player so they pursue and collide
+SPAWN_RADIUS = 20
+
+WARMUP_TICKS = 30
+TICKS_PER_REPEAT = 60
+
+
+def spawn_enemies(game, count):
+    """
+    Replace the level's skeletons with count skeletons around the player.
+    """
+    for enemy in game.enemies:
+        game.tilemap.remove_entity_occupancy(enemy)
+    game.enemies.clear()
+    game.enemy_hash.clear()
+
+    player_tile = (int(game.player.pos[1] + 4) // 16, int(game.player.pos[0] + 7) // 16)
+    tiles = walkable_tiles(game.tilemap.physics_tilemap, player_tile, SPAWN_RADIUS)
+    rng = random.Random(SEED)
+    for _ in range(count):
+        row, col = rng.choice(tiles)
+        game.enemies.append(Enemy(game, (col * game.tilemap.tile_size, row * game.tilemap.tile_size), (14, 16), (14, 6)))
+
+
+def setup_level(count):
+    game = get_game()
+    game.load_level()
+    # The player dying would respawn the level's own skeletons
+    game.player.max_health = game.player.health = 10 ** 9
+    spawn_enemies(game, count)
+    for _ in range(WARMUP_TICKS):
+        game.step()
+    return game
+
+
+def clear_image_caches():
+    utils.atlas_manifest = None
+    utils.atlas_sheets.clear()
+    utils.atlas_decodes.clear()
+
+
+def bench_init():
+    """
+    Game startup with nothing cached from earlier loads: until the title screen can show, and until every asset is in.
+    """
+    from main import Game
+    get_game()
+
+    def all_assets():
+        Game(headless=True, seed=SEED).assets.load_all()
+
+    def title_screen_only():
+        game = Game(headless=True, seed=SEED)
+        game.assets['title_screen']
+        game.assets['title_screen/animation']
+
+    return {
+        'game_init/title_screen': measure(title_screen_only, repeat=5, setup=clear_image_caches),
+        'game_init/assets': measure(all_assets, repeat=5, setup=clear_image_caches),
+    }
+
+
+def run():
+    results = bench_init()
+    for count in ENEMY_COUNTS:
+        game = setup_level(count)
+        results['game_step/skeletons_' + str(count)] = measure(game.step, repeat=5, number=TICKS_PER_REPEAT)
+        results['game_render/skeletons_' + str(count)] = measure(game.render, repeat=5, number=TICKS_PER_REPEAT)
+    return results
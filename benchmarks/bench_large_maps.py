@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from benchmarks.common import get_game, measure, SEED
+from helper_functions.map_generator import generate_map
+from helper_functions.level_compiler import compile_level
+from scripts.tilemap import Tilemap
+
+MAP_SIZES = [128, 256]
+
+# Game ticks are only timed on the largest map
+TICKS_PER_REPEAT = 10
+
+
+def generated_maps(directory):
+    maps = {}
+    for size in MAP_SIZES:
+        maps[size] = generate_map(os.path.join(directory, 'generated_' + str(size) + '.tmx'), size, size, seed=SEED)
+    return maps
+
+
+def run():
+    game = get_game()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        maps = generated_maps(directory)
+        for size, path in maps.items():
+            results['tilemap_load/generated_' + str(size)] = measure(lambda: Tilemap(game).load(path), repeat=3)
+        # The TMX parse and per-tile passes alone, time per tile should stay flat as maps grow
+        for size, path in maps.items():
+            result = measure(lambda: Tilemap(game).load_tmx(path), repeat=3)
+            result['us_per_tile'] = round(result['min_ms'] * 1000 / (size * size), 4)
+            results['tilemap_load_tmx/generated_' + str(size)] = result
+        # Once compiled, the same loads go through the compiled level
+        for size, path in maps.items():
+            compile_level(path)
+            results['tilemap_load_compiled/generated_' + str(size)] = measure(lambda: Tilemap(game).load(path), repeat=3)
+
+        size = MAP_SIZES[-1]
+        game.load_level(maps[size])
+        # The player dying would reset the level
+        game.player.max_health = game.player.health = 10 ** 9
+        game.step()
+        results['game_step/generated_' + str(size)] = measure(game.step, repeat=3, number=TICKS_PER_REPEAT)
+        results['game_render/generated_' + str(size)] = measure(game.render, repeat=3, number=TICKS_PER_REPEAT)
+        # At night the overlay is redrawn whenever the camera moves, the baked static light map plus the moving lights
+        # on screen. The camera steps a pixel every frame so each render redraws it, as while walking.
+        game.weather_system.night_overlay_opacity = 150
+        scroll = game.render_scroll
+
+        def render_night():
+            game.render_scroll = (scroll[0] + 1, scroll[1]) if game.render_scroll == scroll else scroll
+            game.render()
+
+        results['game_render_night/generated_' + str(size)] = measure(render_night, repeat=3, number=TICKS_PER_REPEAT)
+    return results
@@ -0,0 +1,66 @@
+from benchmarks.common import get_game, measure, open_grid, maze_grid
+from scripts.entities import Enemy
+from scripts.tilemap import Tilemap
+from scripts.pathfinding import AStar, build_flow_field
+
+GRID_SIZE = 65
+
+# (row, col) start and goal tiles, odd coordinates are always corridors in the maze
+CASES = {
+    'near': ((31, 31), (31, 41)),
+    'far': ((1, 1), (GRID_SIZE - 2, GRID_SIZE - 2)),
+}
+
+
+def pathfinding_tilemap(game, grid):
+    tilemap = Tilemap(game)
+    tilemap.physics_tilemap = grid
+    tilemap.pathfinder = AStar(grid)
+    return tilemap
+
+
+def bench_construct_path(game, map_name, grid):
+    """
+    Time Enemy.construct_path with an empty path cache (flow field build or A* search) and with a warm one.
+    """
+    results = {}
+    game_tilemap = game.tilemap
+    game.tilemap = pathfinding_tilemap(game, grid)
+    enemy = Enemy(game, (0, 0), (14, 16), (14, 6))
+    game.enemy_hash.remove(enemy)
+    try:
+        for case, (start, goal) in CASES.items():
+            game.tilemap.entity_cells = {enemy: start, game.player: goal}
+
+            def cold():
+                game.tilemap.path_cache.clear()
+                game.tilemap.player_flow_field_target = None
+            results['construct_path/' + map_name + '_' + case + '_cold'] = measure(enemy.construct_path, repeat=5, setup=cold)
+            enemy.construct_path()
+            results['construct_path/' + map_name + '_' + case + '_cached'] = measure(enemy.construct_path, repeat=5, number=100)
+    finally:
+        game.tilemap = game_tilemap
+    return results
+
+
+def bench_search(map_name, grid):
+    """
+    Time the searches behind construct_path directly, without the cache or the flow field radius.
+    """
+    results = {}
+    astar = AStar(grid, max_expansions=GRID_SIZE * GRID_SIZE, max_radius=None)
+    for case, (start, goal) in CASES.items():
+        results['astar/' + map_name + '_' + case] = measure(lambda: astar.find_path(start, goal), repeat=5)
+    results['flow_field/' + map_name] = measure(lambda: build_flow_field(grid, CASES['far'][1]), repeat=5)
+    return results
+
+
+def run():
+    game = get_game()
+    if game.tilemap is None:
+        game.load_level()
+    results = {}
+    for map_name, grid in [('open', open_grid(GRID_SIZE)), ('maze', maze_grid(GRID_SIZE))]:
+        results.update(bench_construct_path(game, map_name, grid))
+        results.update(bench_search(map_name, grid))
+    return results
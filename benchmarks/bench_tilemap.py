@@ -0,0 +1,38 @@
+import os
+import glob
+import random
+
+from benchmarks.common import get_game, measure, SEED
+from scripts.tilemap import Tilemap
+
+
+def bench_load():
+    game = get_game()
+    results = {}
+    for path in sorted(glob.glob('levels/test_level*/*.tmx')):
+        level = os.path.splitext(os.path.basename(path))[0]
+        results['tilemap_load/' + level] = measure(lambda: Tilemap(game).load(path), repeat=3)
+    return results
+
+
+def bench_physics_rects_around():
+    game = get_game()
+    tilemap = Tilemap(game)
+    tilemap.load()
+    rng = random.Random(SEED)
+    positions = [(rng.uniform(0, tilemap.tilemap.width * 16), rng.uniform(0, tilemap.tilemap.height * 16)) for _ in range(1000)]
+
+    results = {}
+    for obj_type, size in [('entity', (14, 6)), ('projectile', (20, 20))]:
+        def query():
+            for pos in positions:
+                tilemap.physics_rects_around(pos, size, obj_type)
+        results['physics_rects_around/' + obj_type + '_x1000'] = measure(query, repeat=5)
+    return results
+
+
+def run():
+    results = {}
+    results.update(bench_load())
+    results.update(bench_physics_rects_around())
+    return results
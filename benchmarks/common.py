@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import random
+import statistics
+
+# Assets and levels are loaded from paths relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+SEED = 1
+
+_game = None
+
+
+def get_game():
+    """
+    Get the shared headless Game, created once as loading every asset is slow.
+    """
+    global _game
+    if _game is None:
+        from main import Game
+        _game = Game(headless=True, seed=SEED)
+    return _game
+
+
+def measure(func, repeat=5, number=1, setup=None):
+    """
+    Time a function.
+
+    :param func: The function to time, called number times per repeat.
+    :param repeat: Number of timed repeats.
+    :param number: Calls per repeat, the result is per call.
+    :param setup: Optional function called (untimed) before every repeat.
+    :return: Dict of per call timings in milliseconds.
+    """
+    # Untimed warmup call so first use costs (imports, caches, allocations) don't land in the first repeat
+    if setup is not None:
+        setup()
+    func()
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        'median_ms': round(statistics.median(times), 4),
+        'min_ms': round(min(times), 4),
+        'mean_ms': round(statistics.mean(times), 4),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def walkable_tiles(physics_tilemap, center=None, radius=None):
+    """
+    :return: List of (row, col) tiles that do not block pathfinding, optionally within a radius of a (row, col) center.
+    """
+    tiles = []
+    for row in range(len(physics_tilemap)):
+        for col in range(len(physics_tilemap[row])):
+            if physics_tilemap[row][col] == 1:
+                continue
+            if center is not None and max(abs(row - center[0]), abs(col - center[1])) > radius:
+                continue
+            tiles.append((row, col))
+    return tiles
+
+
+def open_grid(size):
+    return [[0 for _ in range(size)] for _ in range(size)]
+
+
+def maze_grid(size, seed=SEED):
+    """
+    Perfect maze carved with a randomized depth first search, corridors are one tile wide.
+    """
+    rng = random.Random(seed)
+    grid = [[1 for _ in range(size)] for _ in range(size)]
+    stack = [(1, 1)]
+    grid[1][1] = 0
+    while stack:
+        row, col = stack[-1]
+        neighbours = []
+        for d_row, d_col in [(-2, 0), (2, 0), (0, -2), (0, 2)]:
+            new_row, new_col = row + d_row, col + d_col
+            if 0 < new_row < size - 1 and 0 < new_col < size - 1 and grid[new_row][new_col] == 1:
+                neighbours.append((new_row, new_col))
+        if not neighbours:
+            stack.pop()
+            continue
+        new_row, new_col = rng.choice(neighbours)
+        grid[(row + new_row) // 2][(col + new_col) // 2] = 0
+        grid[new_row][new_col] = 0
+        stack.append((new_row, new_col))
+    return grid
@@ -0,0 +1,125 @@
+"""
+Headless benchmarks for the game's hot paths.
+
+Run from the repository root:
+    python -m benchmarks.run                            # run everything and compare with benchmarks/baseline.json
+    python -m benchmarks.run --only pathfinding         # run a single suite
+    python -m benchmarks.run --output results.json      # also write the results to a file
+    python -m benchmarks.run --save-baseline            # store the results as the new baseline
+
+Timings are per call, in milliseconds. A benchmark regresses when its fastest repeat is more than the threshold
+(and more than MIN_DELTA_MS) slower than the baseline's, in which case the run exits with status 1. Baselines are
+machine specific, regenerate them on the machine the comparison runs on.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import common
+import pygame
+
+from benchmarks import bench_tilemap, bench_game, bench_pathfinding, bench_effects, bench_large_maps
+
+SUITES = {
+    'tilemap': bench_tilemap.run,
+    'game': bench_game.run,
+    'pathfinding': bench_pathfinding.run,
+    'effects': bench_effects.run,
+    'large_maps': bench_large_maps.run,
+}
+
+BASELINE_PATH = os.path.join(common.ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+# Changes smaller than this are timer noise whatever the ratio
+MIN_DELTA_MS = 0.05
+
+
+def run_suites(names):
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        suite_results = SUITES[name]()
+        print(f'{name}: {len(suite_results)} benchmarks in {time.perf_counter() - start:.1f}s')
+        results.update(suite_results)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: List of (name, baseline ms, current ms) for benchmarks slower than the baseline by more than threshold.
+    """
+    regressions = []
+    print(f'\n{"benchmark":<48}{"baseline ms":>14}{"current ms":>14}{"change":>10}')
+    for name, result in results.items():
+        current = result['min_ms']
+        if name not in baseline:
+            print(f'{name:<48}{"-":>14}{current:>14.3f}{"new":>10}')
+            continue
+        previous = baseline[name]['min_ms']
+        change = (current - previous) / previous if previous else 0
+        flag = ''
+        if change > threshold and current - previous > MIN_DELTA_MS:
+            regressions.append((name, previous, current))
+            flag = '  REGRESSION'
+        print(f'{name:<48}{previous:>14.3f}{current:>14.3f}{change:>+10.0%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless benchmark suite.')
+    parser.add_argument('--only', nargs='*', choices=sorted(SUITES), help='suites to run, defaults to all')
+    parser.add_argument('--output', help='write the results JSON to this path')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown before a benchmark counts as a regression, 0.25 = 25%%')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline path instead of comparing')
+    args = parser.parse_args()
+
+    results = run_suites(args.only or list(SUITES))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.save_baseline:
+        baseline = {'meta': report['meta'], 'results': {}}
+        # Keep the entries of suites that were not run
+        if os.path.isfile(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline['results'] = json.load(baseline_file)['results']
+        baseline['results'].update(results)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+        print(f'Saved baseline to {args.baseline}')
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to create one')
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) over {args.threshold:.0%}')
+        return 1
+    print('\nNo regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+# Packs every image under graphics/ into one atlas sheet per category (top level folder) plus a JSON manifest.
+#
+# scripts/utils.load_image / load_images slice the images listed in the manifest out of the sheets, so startup opens a
+# couple dozen sheets instead of every frame's .png. The game trusts the atlases as packed, an image that is not in the
+# manifest is loaded from its own file. The manifest records the hash of every packed .png, --check lists the images
+# edited, added or removed since the last pack (running the game with CHECK_ATLAS_SOURCES=1 loads the edited ones from
+# their own files).
+#
+# Usage, from the repository root:
+#   python helper_functions/atlas_packer.py
+#   python helper_functions/atlas_packer.py --check     # exits with status 1 if the atlases need packing again
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GRAPHICS_PATH = os.path.join(ROOT, 'graphics')
+ATLAS_DIRECTORY = 'atlas'
+
+# Folders that are not game assets (Tiled tilesheets) or are the output
+EXCLUDE_DIRS = ['levels', ATLAS_DIRECTORY]
+
+# Sheets are at most this wide (unless a single image is wider) and grow downwards as far as needed
+MAX_ATLAS_WIDTH = 1024
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+
+def find_images(graphics_path=GRAPHICS_PATH):
+    """
+    :return: Dict of category to the sorted list of image paths relative to graphics_path, using '/' separators.
+    """
+    categories = {}
+    for category in sorted(os.listdir(graphics_path)):
+        category_path = os.path.join(graphics_path, category)
+        if category in EXCLUDE_DIRS or not os.path.isdir(category_path):
+            continue
+        for root, dirnames, filenames in os.walk(category_path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.png'):
+                    path = os.path.relpath(os.path.join(root, filename), graphics_path).replace(os.sep, '/')
+                    categories.setdefault(category, []).append(path)
+    return categories
+
+
+def source_hash(path):
+    with open(path, 'rb') as source_file:
+        return hashlib.sha1(source_file.read()).hexdigest()
+
+
+def shelf_pack(sizes, width):
+    """
+    Shelf pack rectangles into a sheet of a given width, tallest first.
+
+    :param sizes: Dict of name to (width, height).
+    :return: (width, height) of the sheet and a dict of name to (x, y).
+    """
+    positions = {}
+    x = y = shelf_height = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name)):
+        w, h = sizes[name]
+        if x + w > width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        positions[name] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return (width, y + shelf_height), positions
+
+
+def pack(sizes, max_width=MAX_ATLAS_WIDTH):
+    """
+    Shelf pack rectangles, trying power of two widths and whole multiples of the widest image, and keep the smallest
+    sheet (the squarest on ties). Sheet area is what decoding an atlas costs at startup.
+
+    :param sizes: Dict of name to (width, height).
+    :return: (width, height) of the sheet and a dict of name to (x, y).
+    """
+    widest = max(w for w, h in sizes.values())
+    widths = {widest}
+    width = 16
+    while width <= max_width:
+        widths.add(max(width, widest))
+        width *= 2
+    for multiple in range(2, max_width // widest + 1):
+        widths.add(widest * multiple)
+
+    best = None
+    for width in sorted(widths):
+        size, positions = shelf_pack(sizes, width)
+        key = (size[0] * size[1], abs(size[0] - size[1]))
+        if best is None or key < best[0]:
+            best = (key, size, positions)
+    return best[1], best[2]
+
+
+def build_atlases(graphics_path=GRAPHICS_PATH):
+    """
+    Pack every category and write the sheets and manifest to graphics/atlas/.
+
+    :return: The manifest.
+    """
+    output_path = os.path.join(graphics_path, ATLAS_DIRECTORY)
+    os.makedirs(output_path, exist_ok=True)
+    manifest = {'version': 2, 'atlases': {}, 'images': {}}
+    for category, paths in find_images(graphics_path).items():
+        images = {path: pygame.image.load(os.path.join(graphics_path, path)) for path in paths}
+        size, positions = pack({path: image.get_size() for path, image in images.items()})
+        sheet = pygame.Surface(size, pygame.SRCALPHA)
+        sheet.fill((0, 0, 0, 0))
+        for path, image in images.items():
+            # Additive blit onto the cleared sheet copies the pixels (alpha included) as they are, a normal blit would blend
+            sheet.blit(image, positions[path], special_flags=pygame.BLEND_RGBA_ADD)
+            manifest['images'][path] = [category, positions[path][0], positions[path][1], image.get_width(), image.get_height(),
+                                        source_hash(os.path.join(graphics_path, path))]
+        pygame.image.save(sheet, os.path.join(output_path, category + '.png'))
+        manifest['atlases'][category] = {'size': list(size), 'images': len(paths)}
+
+    with open(os.path.join(output_path, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    return manifest
+
+
+def check_atlases(graphics_path=GRAPHICS_PATH):
+    """
+    Compare the images under graphics/ with the manifest of the last pack.
+
+    :return: Lists of the (changed, added, removed) image paths.
+    """
+    manifest_path = os.path.join(graphics_path, ATLAS_DIRECTORY, 'manifest.json')
+    packed = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as manifest_file:
+            packed = json.load(manifest_file)['images']
+    paths = [path for category_paths in find_images(graphics_path).values() for path in category_paths]
+    changed = [path for path in paths
+               if path in packed and (len(packed[path]) < 6 or source_hash(os.path.join(graphics_path, path)) != packed[path][5])]
+    added = [path for path in paths if path not in packed]
+    removed = sorted(set(packed) - set(paths))
+    return changed, added, removed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack the images under graphics/ into per category atlas sheets.')
+    parser.add_argument('--graphics', default=GRAPHICS_PATH, help='graphics folder to pack')
+    parser.add_argument('--check', action='store_true', help='only list the images that changed since the last pack')
+    args = parser.parse_args()
+
+    if args.check:
+        changed, added, removed = check_atlases(args.graphics)
+        for label, paths in (('changed', changed), ('not packed', added), ('removed', removed)):
+            for path in paths:
+                print(f'{label}: {path}')
+        if changed or added or removed:
+            print('The atlases are out of date, run helper_functions/atlas_packer.py')
+            sys.exit(1)
+        print('The atlases are up to date')
+        sys.exit(0)
+
+    pygame.init()
+    manifest = build_atlases(args.graphics)
+    for category, atlas in manifest['atlases'].items():
+        print(f'{category}: {atlas["images"]} images in {atlas["size"][0]}x{atlas["size"][1]}')
+    print(f'{len(manifest["images"])} images in {len(manifest["atlases"])} atlases')
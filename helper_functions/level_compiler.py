@@ -0,0 +1,88 @@
+import os
+import sys
+import argparse
+
+# Compiles TMX levels into the binary level format of scripts/level_format.py.
+#
+# The TMX goes through the regular Tilemap TMX loader once, offline, and everything it derives (per-layer variants,
+# the physics grid, object and animated layer positions, lights) is written out as flat arrays. Tilemap.load picks
+# the compiled file up automatically when it sits next to the TMX and was compiled from the TMX's current contents,
+# recompile after editing a level in Tiled.
+#
+# Usage, from the repository root:
+#   python helper_functions/level_compiler.py levels/test_level_3/test_level_3.tmx
+#   python helper_functions/level_compiler.py --all
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from scripts.tilemap import Tilemap
+from scripts import level_format
+
+
+def compile_level(path, output=None):
+    """
+    Compile a TMX level.
+
+    :param path: TMX file to compile.
+    :param output: Compiled level to write, defaults to the TMX path with the compiled extension.
+    :return: The path written.
+    """
+    # pytmx converts the tileset images, which needs a display
+    if pygame.display.get_surface() is None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+    tilemap = Tilemap(None)
+    tilemap.load_tmx(path)
+    width, height = tilemap.tilemap.width, tilemap.tilemap.height
+
+    layer_names = [layer.name for layer in tilemap.tmx_data.visible_layers]
+    layers = [[] for _ in layer_names]
+    for index, tiles in enumerate(tilemap.tilemap.cells):
+        for tile in tiles or ():
+            layers[tile['layer']].append((index, tile['variant']))
+
+    return level_format.write(
+        output or level_format.compiled_path(path),
+        width,
+        height,
+        list(zip(layer_names, layers)),
+        tilemap.tilemap_layer_data_values,
+        tilemap.physics_tilemap,
+        {k: v['positions'] for k, v in tilemap.object_layers.items()},
+        {k: v['positions'] for k, v in tilemap.animated_layers.items()},
+        [(light['pos'][0], light['pos'][1], light['type']) for light in tilemap.lights],
+        level_format.source_hash(path),
+    )
+
+
+def find_levels(directory=os.path.join(ROOT, 'levels')):
+    levels = []
+    for folder, _, files in os.walk(directory):
+        for file in sorted(files):
+            if file.endswith('.tmx'):
+                levels.append(os.path.join(folder, file))
+    return sorted(levels)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile TMX levels into binary level files.')
+    parser.add_argument('levels', nargs='*', help='TMX files to compile')
+    parser.add_argument('--all', action='store_true', help='compile every TMX under levels/')
+    parser.add_argument('-o', '--output', help='compiled level to write, only with a single TMX')
+    args = parser.parse_args()
+
+    paths = find_levels() if args.all else args.levels
+    if not paths:
+        parser.error('give TMX files to compile or --all')
+    if args.output and len(paths) != 1:
+        parser.error('--output needs exactly one TMX')
+    for path in paths:
+        written = compile_level(path, args.output)
+        print(f'{path} -> {written} ({os.path.getsize(written)} bytes)')
@@ -0,0 +1,322 @@
+import os
+import random
+import argparse
+import xml.etree.ElementTree as ET
+
+# Generates large synthetic TMX levels for scale and stress testing.
+#
+# Layers, tile ids and multi-tile stamps (trees, bonfires) are learned from a template level so the output uses the
+# same tileset and layer names Tilemap expects. Tilemap numbers a layer's variants in the order its tile ids first
+# appear (row by row), so for layers with several tile ids the top row starts with the template's ids in their
+# first appearance order, the same legend the hand-made levels keep in their top left corner.
+#
+# Usage, from the repository root:
+#   python helper_functions/map_generator.py --width 256 --height 256 --enemy-density 0.01 -o levels/generated/map_256.tmx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(ROOT, 'levels', 'test_level_3', 'test_level_3.tmx')
+
+# Layers placed as multi-tile stamps copied from the template
+STAMP_LAYERS = ['tree', 'bonfire']
+
+# Single tile objects scattered over free ground, with their default density (fraction of interior tiles)
+SCATTER_LAYERS = {
+    'bush': 0.005,
+    'rock': 0.005,
+    'red_flower': 0.003,
+    'purple_flower': 0.006,
+    'bronze_chest': 0.0004,
+    'silver_chest': 0.0002,
+    'gold_chest': 0.0001,
+}
+
+
+class MapTemplate:
+    """
+    Layer attributes, tile id order, tile id frequencies and stamps learned from a template TMX level.
+    """
+    def __init__(self, path=TEMPLATE_PATH):
+        self.path = path
+        self.root = ET.parse(path).getroot()
+        self.tileset_source = os.path.join(os.path.dirname(path), self.root.find('tileset').get('source'))
+        self.layers = []
+        self.gid_order = {}
+        self.gid_counts = {}
+        self.stamps = {}
+        self.data = {}
+        for layer in self.root.iter('layer'):
+            name = layer.get('name')
+            rows = [[int(gid) for gid in line.split(',') if gid.strip()] for line in layer.find('data').text.strip().split('\n')]
+            self.layers.append({k: v for k, v in layer.attrib.items() if k not in ('width', 'height')})
+            self.data[name] = rows
+            self.gid_order[name] = []
+            self.gid_counts[name] = {}
+            for row in rows:
+                for gid in row:
+                    if gid:
+                        if gid not in self.gid_counts[name]:
+                            self.gid_order[name].append(gid)
+                            self.gid_counts[name][gid] = 0
+                        self.gid_counts[name][gid] += 1
+            if name in STAMP_LAYERS and self.gid_order[name]:
+                self.stamps[name] = self.learn_stamp(rows, self.gid_order[name][0])
+
+    def learn_stamp(self, rows, top_left_gid):
+        """
+        Cut the first stamp (starting at the first top left tile id) out of a layer.
+
+        :return: 2D list of tile ids, rows of the stamp.
+        """
+        for y, row in enumerate(rows):
+            if top_left_gid in row:
+                x = row.index(top_left_gid)
+                width = 0
+                while x + width < len(row) and row[x + width]:
+                    width += 1
+                height = 0
+                while y + height < len(rows) and rows[y + height][x]:
+                    height += 1
+                return [rows[y + dy][x:x + width] for dy in range(height)]
+        return [[top_left_gid]]
+
+    def gid(self, name, rng):
+        """
+        Random tile id for a layer, weighted by how often the template uses it.
+        """
+        gids = self.gid_order[name]
+        return rng.choices(gids, weights=[self.gid_counts[name][gid] for gid in gids])[0]
+
+    def border(self):
+        """
+        Wall tile ids of the template's outer wall ring.
+
+        :return: Dict of tile ids keyed by 'top_left', 'top', 'top_right', 'left', 'right', 'bottom_left', 'bottom' and 'bottom_right'.
+        """
+        walls = self.data['walls']
+        return {
+            'top_left': walls[0][0], 'top': walls[0][1], 'top_right': walls[0][-1],
+            'left': walls[1][0], 'right': walls[1][-1],
+            'bottom_left': walls[-1][0], 'bottom': walls[-1][1], 'bottom_right': walls[-1][-1],
+        }
+
+
+class MapGenerator:
+    def __init__(self, width, height, enemy_density=0.01, light_density=0.005, wall_density=0.01, water_density=0.004,
+                 lava_density=0.001, tree_density=0.004, bonfire_density=0.0003, seed=None, template=None):
+        """
+        :param width: Map width in tiles.
+        :param height: Map height in tiles.
+        :param enemy_density: Skeletons per interior tile.
+        :param light_density: Lights and torches (half each) per interior tile.
+        :param wall_density: Wall segments per interior tile.
+        :param water_density: Water pools (crossed by a bridge) per interior tile.
+        :param lava_density: Lava pools per interior tile.
+        :param tree_density: Trees per interior tile.
+        :param bonfire_density: Bonfires per interior tile, at least one is always placed.
+        :param seed: Seed for the generator's own random.Random.
+        :param template: MapTemplate to learn from, defaults to test_level_3.
+        """
+        self.width = width
+        self.height = height
+        self.enemy_density = enemy_density
+        self.light_density = light_density
+        self.wall_density = wall_density
+        self.water_density = water_density
+        self.lava_density = lava_density
+        self.tree_density = tree_density
+        self.bonfire_density = bonfire_density
+        self.rng = random.Random(seed)
+        self.template = template if template is not None else MapTemplate()
+        self.layers = {layer['name']: [[0] * width for _ in range(height)] for layer in self.template.layers}
+        # Tiles already holding something that blocks or would overlap another object
+        self.occupied = [[False] * width for _ in range(height)]
+
+    def count(self, density):
+        return int((self.width - 2) * (self.height - 2) * density)
+
+    def random_tile(self, margin=1):
+        return self.rng.randint(margin, self.width - 1 - margin), self.rng.randint(margin, self.height - 1 - margin)
+
+    def is_free(self, x, y, width=1, height=1):
+        if x < 1 or y < 1 or x + width > self.width - 1 or y + height > self.height - 1:
+            return False
+        for dy in range(height):
+            for dx in range(width):
+                if self.occupied[y + dy][x + dx]:
+                    return False
+        return True
+
+    def fill(self, layer, x, y, gid, block=True):
+        self.layers[layer][y][x] = gid
+        if block:
+            self.occupied[y][x] = True
+
+    def place(self, layer, count, gid=None, attempts=20):
+        """
+        Scatter single tiles of a layer over free tiles.
+        """
+        for _ in range(count):
+            for _ in range(attempts):
+                x, y = self.random_tile()
+                if self.is_free(x, y):
+                    self.fill(layer, x, y, gid if gid is not None else self.template.gid(layer, self.rng))
+                    break
+
+    def place_stamps(self, layer, count, attempts=20):
+        stamp = self.template.stamps.get(layer)
+        if stamp is None:
+            return
+        for _ in range(count):
+            for _ in range(attempts):
+                x, y = self.random_tile()
+                # Keep a free tile around stamps so large objects stay reachable
+                if self.is_free(x - 1, y - 1, len(stamp[0]) + 2, len(stamp) + 2):
+                    for dy, row in enumerate(stamp):
+                        for dx, gid in enumerate(row):
+                            self.fill(layer, x + dx, y + dy, gid)
+                    break
+
+    def generate_ground(self):
+        for y in range(self.height):
+            for x in range(self.width):
+                self.layers['ground'][y][x] = self.template.gid('ground', self.rng)
+
+    def generate_walls(self):
+        border = self.template.border()
+        for x in range(self.width):
+            self.fill('walls', x, 0, border['top'])
+            self.fill('walls', x, self.height - 1, border['bottom'])
+        for y in range(self.height):
+            self.fill('walls', 0, y, border['left'])
+            self.fill('walls', self.width - 1, y, border['right'])
+        self.fill('walls', 0, 0, border['top_left'])
+        self.fill('walls', self.width - 1, 0, border['top_right'])
+        self.fill('walls', 0, self.height - 1, border['bottom_left'])
+        self.fill('walls', self.width - 1, self.height - 1, border['bottom_right'])
+
+        # Straight wall segments, horizontal ones use the top edge tile and vertical ones the left edge tile
+        for _ in range(self.count(self.wall_density)):
+            x, y = self.random_tile(margin=2)
+            length = self.rng.randint(3, 10)
+            horizontal = self.rng.random() < 0.5
+            for i in range(length):
+                wx, wy = (x + i, y) if horizontal else (x, y + i)
+                if self.is_free(wx, wy):
+                    self.fill('walls', wx, wy, border['top'] if horizontal else border['left'])
+
+    def generate_pools(self, layer, count, bridge=False):
+        gid = self.template.gid_order[layer][0]
+        for _ in range(count):
+            pool_width, pool_height = self.rng.randint(3, 8), self.rng.randint(3, 6)
+            x, y = self.random_tile(margin=2)
+            if not self.is_free(x - 1, y - 1, pool_width + 2, pool_height + 2):
+                continue
+            for dy in range(pool_height):
+                for dx in range(pool_width):
+                    self.fill(layer, x + dx, y + dy, gid)
+            if bridge:
+                # Bridge across the middle of the pool, bridges cancel the pool's physics
+                bridge_y = y + pool_height // 2
+                for bx in range(x - 1, x + pool_width + 1):
+                    self.fill('bridge', bx, bridge_y, self.template.gid_order['bridge'][0])
+
+    def generate_objects(self):
+        lights = self.count(self.light_density)
+        self.place('torch', lights // 2)
+        self.place('light', lights - lights // 2)
+        for layer, density in SCATTER_LAYERS.items():
+            self.place(layer, self.count(density))
+        self.place_stamps('tree', self.count(self.tree_density))
+        self.place_stamps('bonfire', max(1, self.count(self.bonfire_density)))
+
+    def generate_entities(self):
+        # Player as close to the middle as there is room
+        for radius in range(0, max(self.width, self.height)):
+            x = self.width // 2 + self.rng.randint(-radius, radius)
+            y = self.height // 2 + self.rng.randint(-radius, radius)
+            if self.is_free(x, y):
+                self.fill('player', x, y, self.template.gid_order['player'][0])
+                break
+        self.place('skeleton', self.count(self.enemy_density), gid=self.template.gid_order['skeleton'][0])
+
+    def write_legends(self):
+        """
+        Start the top row of every multi tile id layer with the template's tile ids in first appearance order,
+        unless the generated tile ids already first appear in that order.
+        """
+        for name, layer in self.layers.items():
+            order = self.template.gid_order[name]
+            if len(order) < 2 or name in STAMP_LAYERS:
+                continue
+            generated_order = []
+            for row in layer:
+                for gid in row:
+                    if gid and gid not in generated_order:
+                        generated_order.append(gid)
+            if generated_order == order[:len(generated_order)]:
+                continue
+            for x, gid in enumerate(order[:self.width]):
+                layer[0][x] = gid
+
+    def generate(self):
+        self.generate_ground()
+        self.generate_walls()
+        self.generate_pools('water', self.count(self.water_density), bridge=True)
+        self.generate_pools('lava', self.count(self.lava_density))
+        self.generate_objects()
+        self.generate_entities()
+        self.write_legends()
+        return self.layers
+
+    def write(self, path):
+        """
+        Generate the map and write it as a TMX file using the template's tileset.
+        """
+        self.generate()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tileset_source = os.path.relpath(self.template.tileset_source, directory).replace(os.sep, '/')
+        next_layer_id = self.template.root.get('nextlayerid')
+
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<map version="1.10" tiledversion="1.11.0" orientation="orthogonal" renderorder="right-down" width="{self.width}" height="{self.height}" tilewidth="16" tileheight="16" infinite="0" nextlayerid="{next_layer_id}" nextobjectid="1">',
+            f' <tileset firstgid="1" source="{tileset_source}"/>',
+        ]
+        for layer in self.template.layers:
+            attributes = ' '.join(f'{k}="{v}"' for k, v in layer.items() if k not in ('id', 'name'))
+            lines.append(f' <layer id="{layer["id"]}" name="{layer["name"]}" width="{self.width}" height="{self.height}"' + (' ' + attributes if attributes else '') + '>')
+            lines.append('  <data encoding="csv">')
+            rows = self.layers[layer['name']]
+            lines.append(',\n'.join(','.join(map(str, row)) for row in rows))
+            lines.append('</data>')
+            lines.append(' </layer>')
+        lines.append('</map>')
+
+        with open(path, 'w') as tmx_file:
+            tmx_file.write('\n'.join(lines) + '\n')
+        return path
+
+
+def generate_map(path, width, height, **kwargs):
+    """
+    Write a generated level, see MapGenerator for the options.
+
+    :return: The path written to.
+    """
+    return MapGenerator(width, height, **kwargs).write(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic TMX level for scale testing.')
+    parser.add_argument('-o', '--output', required=True, help='TMX file to write')
+    parser.add_argument('--width', type=int, default=256)
+    parser.add_argument('--height', type=int, default=256)
+    parser.add_argument('--enemy-density', type=float, default=0.01, help='skeletons per interior tile')
+    parser.add_argument('--light-density', type=float, default=0.005, help='lights and torches per interior tile')
+    parser.add_argument('--wall-density', type=float, default=0.01, help='wall segments per interior tile')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    generate_map(args.output, args.width, args.height, enemy_density=args.enemy_density, light_density=args.light_density,
+                 wall_density=args.wall_density, seed=args.seed)
+    print(f'Wrote {args.width}x{args.height} level to {args.output}')
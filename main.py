@@ -1,6 +1,7 @@
 # /// script
 # dependencies = [
-#  "pytmx"
+#  "pytmx",
+#  "numpy"
 # ]
 # ///
 import pygame
@@ -10,11 +11,11 @@ import math
 import json
 import os
 from scripts.entities import PhysicsEntity, Player, Enemy
-from scripts.utils import load_image, load_images, Animation
-from scripts.tilemap import Tilemap
-from scripts.tilemap import Tilemap
-from scripts.particle import Particle
-from scripts.light import Light
+from scripts.utils import load_image, load_images, scale, Animation
+from scripts.asset_manager import AssetManager
+from scripts.tilemap import Tilemap, DEFAULT_LEVEL
+from scripts.particle import ParticleSystem, ParticleEmitter
+from scripts.light import Light, LightMap, DynamicLights
 from scripts.ui import UI
 from scripts.precipitation import Precipitation, Raindrops
 from scripts.projectile import Projectile, FireballSpell
@@ -27,157 +28,179 @@ from scripts.chest import Chest
 from scripts.weapon import Weapon
 from scripts.spell import Spell
 from scripts.multianimated import MultiAnimated
+from scripts.spatial_hash import SpatialHash
+from scripts.profiler import Profiler
 
 import asyncio
 
+# Gameplay assets loaded per title screen frame, few enough that the animation doesn't stutter
+ASSETS_PER_FRAME = 4
+
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, seed=None):
+        # Headless runs skip the window and the start screen and are driven through step()/run_headless()
+        self.headless = headless
+        self.seed = seed
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
 
         pygame.init()
 
         pygame.display.set_caption("Draconic Isles")
-        self.screen = pygame.display.set_mode((720, 600))
+        if headless:
+            # The dummy driver opens no window, a video mode is still needed for Surface.convert()
+            self.screen = pygame.display.set_mode((1, 1))
+        else:
+            self.screen = pygame.display.set_mode((720, 600))
         self.screen.fill((0, 0, 0))
         self.display = pygame.Surface((360, 280), pygame.SRCALPHA)
         self.clock = pygame.time.Clock()
-        self.show_start_screen = True
+        self.show_start_screen = not headless
         self.show_upgrade_screen = False
+        self.continue_save = False
+        self.tilemap = None
+        self.ticks = 0
+        # Per-frame phase timings and counters, toggled with F3, F4 dumps the trace
+        self.profiler = Profiler()
 
         self.movement_x = [False, False]
         self.movement_y = [False, False]
 
-        self.assets = {
+        # Loaded on first use, the title screen's assets right away and the rest in the background while it animates
+        self.assets = AssetManager({
             # title screen assets
-            'title_screen': load_image('screens/title_screen/0.png'),
-            'title_screen/animation': Animation(load_images('screens/title_screen/animation'), img_dur = 7),
-            'continue_button': load_image('screens/buttons/continue_button/0.png'),
-            'continue_button_hover' : load_image('screens/buttons/continue_button/1.png'),
-            'continue_button_greyed_out' : load_image('screens/buttons/continue_button/2.png'),
-            'new_game_button': load_image('screens/buttons/new_game_button/0.png'),
-            'new_game_button_hover': load_image('screens/buttons/new_game_button/1.png'),
+            'title_screen': lambda: load_image('screens/title_screen/0.png'),
+            'title_screen/animation': lambda: Animation(load_images('screens/title_screen/animation'), img_dur = 7),
+            'continue_button': lambda: load_image('screens/buttons/continue_button/0.png'),
+            'continue_button_hover' : lambda: load_image('screens/buttons/continue_button/1.png'),
+            'continue_button_greyed_out' : lambda: load_image('screens/buttons/continue_button/2.png'),
+            'new_game_button': lambda: load_image('screens/buttons/new_game_button/0.png'),
+            'new_game_button_hover': lambda: load_image('screens/buttons/new_game_button/1.png'),
             # upgrade screen
-            'upgrade_screen' : load_image('screens/upgrade_screen/0.png'),
+            'upgrade_screen' : lambda: load_image('screens/upgrade_screen/0.png'),
             # inventory screen
-            'inventory_screen' : load_image('screens/inventory_screen/0.png'),
+            'inventory_screen' : lambda: load_image('screens/inventory_screen/0.png'),
             # player
-            'player': load_images('player/'),
+            'player': lambda: load_images('player/'),
             # skeleton
-            'skeleton': load_images('skeleton/'),
+            'skeleton': lambda: load_images('skeleton/'),
             # wall types
-            'walls': load_images('walls/'),
+            'walls': lambda: load_images('walls/'),
             # ground types
-            'ground': load_images('ground/'),
+            'ground': lambda: load_images('ground/'),
             # lamp
-            'light': load_images('light/'),
+            'light': lambda: load_images('light/'),
             #torch
-            'torch' : load_image('torch/0.png'),
-            'torch/animation' : Animation(load_images('torch/animation'), img_dur=10),
+            'torch' : lambda: load_image('torch/0.png'),
+            'torch/animation' : lambda: Animation(load_images('torch/animation'), img_dur=10),
             # trees
-            'tree': load_images('tree/'),
-            'tree/animation' :  Animation(load_images('tree/animation'), img_dur=60),
+            'tree': lambda: load_images('tree/'),
+            'tree/animation' :  lambda: Animation(load_images('tree/animation'), img_dur=60),
             # bridges
-            'bridge': load_images('bridge'),
+            'bridge': lambda: load_images('bridge'),
             # bushes
-            'bush': load_images('bush/'),
-            'bush/animation' :  Animation(load_images('bush/animation'), img_dur=30),
+            'bush': lambda: load_images('bush/'),
+            'bush/animation' :  lambda: Animation(load_images('bush/animation'), img_dur=30),
             # rocks
-            'rock': load_images('rock/'),
+            'rock': lambda: load_images('rock/'),
             # flowers
-            'red_flower' : load_images('flowers/red_flower'),
-            'red_flower/animation' :  Animation(load_images('flowers/red_flower/animation'), img_dur=30),
-            'purple_flower' : load_images('flowers/purple_flower'),
-            'purple_flower/animation' :  Animation(load_images('flowers/purple_flower/animation'), img_dur=30),
+            'red_flower' : lambda: load_images('flowers/red_flower'),
+            'red_flower/animation' :  lambda: Animation(load_images('flowers/red_flower/animation'), img_dur=30),
+            'purple_flower' : lambda: load_images('flowers/purple_flower'),
+            'purple_flower/animation' :  lambda: Animation(load_images('flowers/purple_flower/animation'), img_dur=30),
             # player animations
-            'player/idle_down': Animation(load_images('player/idle/idle_down'), img_dur=25),
-            'player/idle_up': Animation(load_images('player/idle/idle_up'), img_dur=25),
-            'player/idle_horizontal': Animation(load_images('player/idle/idle_horizontal'), img_dur=25),
-            'player/walking_down': Animation(load_images('player/walking/walking_down'), img_dur=4),
-            'player/walking_up': Animation(load_images('player/walking/walking_up'), img_dur=4),
-            'player/walking_horizontal': Animation(load_images('player/walking/walking_horizontal'), img_dur=8),
+            'player/idle_down': lambda: Animation(load_images('player/idle/idle_down'), img_dur=25),
+            'player/idle_up': lambda: Animation(load_images('player/idle/idle_up'), img_dur=25),
+            'player/idle_horizontal': lambda: Animation(load_images('player/idle/idle_horizontal'), img_dur=25),
+            'player/walking_down': lambda: Animation(load_images('player/walking/walking_down'), img_dur=4),
+            'player/walking_up': lambda: Animation(load_images('player/walking/walking_up'), img_dur=4),
+            'player/walking_horizontal': lambda: Animation(load_images('player/walking/walking_horizontal'), img_dur=8),
             # sekelton animations
-            'skeleton/idle_down': Animation(load_images('skeleton/idle/idle_down'), img_dur=25),
-            'skeleton/idle_up': Animation(load_images('skeleton/idle/idle_up'), img_dur=25),
-            'skeleton/idle_horizontal': Animation(load_images('skeleton/idle/idle_horizontal'), img_dur=25),
-            'skeleton/walking_down': Animation(load_images('skeleton/walking/walking_down'), img_dur=4),
-            'skeleton/walking_up': Animation(load_images('skeleton/walking/walking_up'), img_dur=4),
-            'skeleton/walking_horizontal': Animation(load_images('skeleton/walking/walking_horizontal'), img_dur=8),
+            'skeleton/idle_down': lambda: Animation(load_images('skeleton/idle/idle_down'), img_dur=25),
+            'skeleton/idle_up': lambda: Animation(load_images('skeleton/idle/idle_up'), img_dur=25),
+            'skeleton/idle_horizontal': lambda: Animation(load_images('skeleton/idle/idle_horizontal'), img_dur=25),
+            'skeleton/walking_down': lambda: Animation(load_images('skeleton/walking/walking_down'), img_dur=4),
+            'skeleton/walking_up': lambda: Animation(load_images('skeleton/walking/walking_up'), img_dur=4),
+            'skeleton/walking_horizontal': lambda: Animation(load_images('skeleton/walking/walking_horizontal'), img_dur=8),
             # UI
-            'player_attribute_bar': load_image('ui/player_attribute_bar.png'),
-            'minor_enemy_health_bar': load_image('ui/minor_enemy_health_bar.png'),
-            'equipped_weapon_card' : load_image('ui/equipped_weapon_card.png'),
-            'equipped_spell_card' : load_image('ui/equipped_spell_card.png'),
-            'soul_counter_card' : load_image('ui/soul_counter_card.png'),
+            'player_attribute_bar': lambda: load_image('ui/player_attribute_bar.png'),
+            'minor_enemy_health_bar': lambda: load_image('ui/minor_enemy_health_bar.png'),
+            'equipped_weapon_card' : lambda: load_image('ui/equipped_weapon_card.png'),
+            'equipped_spell_card' : lambda: load_image('ui/equipped_spell_card.png'),
+            'soul_counter_card' : lambda: load_image('ui/soul_counter_card.png'),
             # basic sword
-            'basic_sword' : load_image('weapons/swords/basic_sword/basic_sword.png'),
-            'basic_sword_vertical' : load_image('weapons/swords/basic_sword/basic_sword_vertical.png'),
-            'basic_sword_horizontal' : load_image('weapons/swords/basic_sword/basic_sword_horizontal.png'),
-            'basic_sword_drop' : load_image('weapons/swords/basic_sword/basic_sword_drop.png'),
+            'basic_sword' : lambda: load_image('weapons/swords/basic_sword/basic_sword.png'),
+            'basic_sword_vertical' : lambda: load_image('weapons/swords/basic_sword/basic_sword_vertical.png'),
+            'basic_sword_horizontal' : lambda: load_image('weapons/swords/basic_sword/basic_sword_horizontal.png'),
+            'basic_sword_drop' : lambda: load_image('weapons/swords/basic_sword/basic_sword_drop.png'),
             # heavy sword
-            'heavy_sword' : load_image('weapons/swords/heavy_sword/heavy_sword.png'),
-            'heavy_sword_vertical' : load_image('weapons/swords/heavy_sword/heavy_sword_vertical.png'),
-            'heavy_sword_horizontal' : load_image('weapons/swords/heavy_sword/heavy_sword_horizontal.png'),
-            'heavy_sword_drop' : load_image('weapons/swords/heavy_sword/heavy_sword_drop.png'),
+            'heavy_sword' : lambda: load_image('weapons/swords/heavy_sword/heavy_sword.png'),
+            'heavy_sword_vertical' : lambda: load_image('weapons/swords/heavy_sword/heavy_sword_vertical.png'),
+            'heavy_sword_horizontal' : lambda: load_image('weapons/swords/heavy_sword/heavy_sword_horizontal.png'),
+            'heavy_sword_drop' : lambda: load_image('weapons/swords/heavy_sword/heavy_sword_drop.png'),
             # fireball
-            'fireball' : load_image('spells/damage/fireball/fireball.png'),
-            'fireball_drop' : load_image('spells/damage/fireball/fireball_drop.png'),
-            'fireballspell_horizontal' : Animation(load_images('spells/damage/fireball/traveling_horizontal'), img_dur=8),
-            'fireballspell_vertical' : Animation(load_images('spells/damage/fireball/traveling_vertical'), img_dur=8),
-            'fireballspell_impact' : Animation(load_images('spells/damage/fireball/impact'), img_dur=2),
+            'fireball' : lambda: load_image('spells/damage/fireball/fireball.png'),
+            'fireball_drop' : lambda: load_image('spells/damage/fireball/fireball_drop.png'),
+            'fireballspell_horizontal' : lambda: Animation(load_images('spells/damage/fireball/traveling_horizontal'), img_dur=8),
+            'fireballspell_vertical' : lambda: Animation(load_images('spells/damage/fireball/traveling_vertical'), img_dur=8),
+            'fireballspell_impact' : lambda: Animation(load_images('spells/damage/fireball/impact'), img_dur=2),
             # lightning
-            'lightning' : load_image('spells/damage/lightning/lightning.png'),
-            'lightning_drop' : load_image('spells/damage/lightning/lightning_drop.png'),
+            'lightning' : lambda: load_image('spells/damage/lightning/lightning.png'),
+            'lightning_drop' : lambda: load_image('spells/damage/lightning/lightning_drop.png'),
             # particles
-            'particles/torch_particle': Animation(load_images('particles/torch_particle/'), img_dur=10, loop=False),
-            'particles/smoke_particle': Animation(load_images('particles/smoke_particle/'), img_dur=40, loop=False),
-            'particles/soul_particle' : Animation(load_images('particles/soul_particle/'), img_dur=40, loop=False),
+            'particles/torch_particle': lambda: Animation(load_images('particles/torch_particle/'), img_dur=10, loop=False),
+            'particles/smoke_particle': lambda: Animation(load_images('particles/smoke_particle/'), img_dur=40, loop=False),
+            'particles/soul_particle' : lambda: Animation(load_images('particles/soul_particle/'), img_dur=40, loop=False),
             #bonfire
-            'bonfire': load_images('bonfire/'),
-            'bonfire/animation': Animation(load_images('bonfire/animation'), img_dur=8),
+            'bonfire': lambda: load_images('bonfire/'),
+            'bonfire/animation': lambda: Animation(load_images('bonfire/animation'), img_dur=8),
             # water
-            'water': load_images('water/'),
-            'water/animation' : Animation(load_images('water/animation'), img_dur=10),
+            'water': lambda: load_images('water/'),
+            'water/animation' : lambda: Animation(load_images('water/animation'), img_dur=10),
             # lava
-            'lava': load_images('lava/'),
-            'lava/animation' : Animation(load_images('lava/animation'), img_dur=20),
+            'lava': lambda: load_images('lava/'),
+            'lava/animation' : lambda: Animation(load_images('lava/animation'), img_dur=20),
             # keys
-            'f_key': load_image('keys/f_key/0.png'),
+            'f_key': lambda: load_image('keys/f_key/0.png'),
             # digits
-            'grey_digits' : load_images('digits/grey_digits'),
-            'red_digits' : load_images('digits/red_digits'),
-            'green_digits' : load_images('digits/green_digits'),
-            'blue_digits' : load_images('digits/blue_digits'),
+            'grey_digits' : lambda: load_images('digits/grey_digits'),
+            'red_digits' : lambda: load_images('digits/red_digits'),
+            'green_digits' : lambda: load_images('digits/green_digits'),
+            'blue_digits' : lambda: load_images('digits/blue_digits'),
             # letters
-            'grey_letters' : load_images('letters/grey_letters'),
+            'grey_letters' : lambda: load_images('letters/grey_letters'),
             # dropped souls
-            'dropped_souls' : load_image('drops/souls/0.png'),
+            'dropped_souls' : lambda: load_image('drops/souls/0.png'),
             # upgrade arrows
-            'upgrade_arrow' : load_image('ui/arrows/upgrade_arrow/upgrade_arrow.png'),
-            'upgrade_arrow_hover' : load_image('ui/arrows/upgrade_arrow/upgrade_arrow_hover.png'),
-            'upgrade_arrow_greyed_out' : load_image('ui/arrows/upgrade_arrow/upgrade_arrow_greyed_out.png'),
+            'upgrade_arrow' : lambda: load_image('ui/arrows/upgrade_arrow/upgrade_arrow.png'),
+            'upgrade_arrow_hover' : lambda: load_image('ui/arrows/upgrade_arrow/upgrade_arrow_hover.png'),
+            'upgrade_arrow_greyed_out' : lambda: load_image('ui/arrows/upgrade_arrow/upgrade_arrow_greyed_out.png'),
             # downgrade arrows
-            'downgrade_arrow' : load_image('ui/arrows/downgrade_arrow/downgrade_arrow.png'),
-            'downgrade_arrow_hover' : load_image('ui/arrows/downgrade_arrow/downgrade_arrow_hover.png'),
-            'downgrade_arrow_greyed_out' : load_image('ui/arrows/downgrade_arrow/downgrade_arrow_greyed_out.png'),
+            'downgrade_arrow' : lambda: load_image('ui/arrows/downgrade_arrow/downgrade_arrow.png'),
+            'downgrade_arrow_hover' : lambda: load_image('ui/arrows/downgrade_arrow/downgrade_arrow_hover.png'),
+            'downgrade_arrow_greyed_out' : lambda: load_image('ui/arrows/downgrade_arrow/downgrade_arrow_greyed_out.png'),
             # confirm button
-            'confirm_button' : load_image('screens/buttons/confirm_button/confirm_button.png'),
-            'confirm_button_hover' : load_image('screens/buttons/confirm_button/confirm_button_hover.png'),
-            'confirm_button_greyed_out' : load_image('screens/buttons/confirm_button/confirm_button_greyed_out.png'),
+            'confirm_button' : lambda: load_image('screens/buttons/confirm_button/confirm_button.png'),
+            'confirm_button_hover' : lambda: load_image('screens/buttons/confirm_button/confirm_button_hover.png'),
+            'confirm_button_greyed_out' : lambda: load_image('screens/buttons/confirm_button/confirm_button_greyed_out.png'),
             # equip button
-            'equip_button' : load_image('screens/buttons/equip_button/equip_button.png'),
-            'equip_button_hover' : load_image('screens/buttons/equip_button/equip_button_hover.png'),
-            'equip_button_greyed_out' : load_image('screens/buttons/equip_button/equip_button_greyed_out.png'),
+            'equip_button' : lambda: load_image('screens/buttons/equip_button/equip_button.png'),
+            'equip_button_hover' : lambda: load_image('screens/buttons/equip_button/equip_button_hover.png'),
+            'equip_button_greyed_out' : lambda: load_image('screens/buttons/equip_button/equip_button_greyed_out.png'),
             # next level ui piece
-            'next_level' : load_image('ui/next_level.png'),
+            'next_level' : lambda: load_image('ui/next_level.png'),
             # chests
-            'bronze_chest' : load_image('bronze_chest/0.png'),
-            'silver_chest' : load_image('silver_chest/0.png'),
-            'gold_chest' : load_image('gold_chest/0.png'),
-            'bronze_chest_animation' : Animation(load_images('bronze_chest/animation/'), img_dur=5, loop=False),
-            'silver_chest_animation' : Animation(load_images('silver_chest/animation/'), img_dur=5, loop=False),
-            'gold_chest_animation' : Animation(load_images('gold_chest/animation/'), img_dur=5, loop=False),
-        }
+            'bronze_chest' : lambda: load_image('bronze_chest/0.png'),
+            'silver_chest' : lambda: load_image('silver_chest/0.png'),
+            'gold_chest' : lambda: load_image('gold_chest/0.png'),
+            'bronze_chest_animation' : lambda: Animation(load_images('bronze_chest/animation/'), img_dur=5, loop=False),
+            'silver_chest_animation' : lambda: Animation(load_images('silver_chest/animation/'), img_dur=5, loop=False),
+            'gold_chest_animation' : lambda: Animation(load_images('gold_chest/animation/'), img_dur=5, loop=False),
+        })
+        self.assets.preload()
+
         self.audio = {
             # TODO audio lol retard
         }
@@ -201,7 +224,10 @@ class Game:
 
     # Handles all logic in the start screen when the game is initially booted up
     def reset_enemies(self):
+        for enemy in self.enemies:
+            self.tilemap.remove_entity_occupancy(enemy)
         self.enemies.clear()
+        self.enemy_hash.clear()
         for k in self.tilemap.object_layers:
             for v in self.tilemap.object_layers[k]['positions']:
                 if k == 'skeleton':
@@ -240,7 +266,7 @@ class Game:
         mana_levels_applied = 0
 
         while True:
-            self.screen.blit(pygame.transform.scale(self.assets['upgrade_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
+            self.screen.blit(scale(self.assets['upgrade_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
             cursor_pos = pygame.mouse.get_pos()
             # Conditions for handling button_states based on cursor positions
             if True:
@@ -249,7 +275,7 @@ class Game:
                 self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
 
                 # Upgrade Screen
-                self.screen.blit(pygame.transform.scale(self.assets['upgrade_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
+                self.screen.blit(scale(self.assets['upgrade_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
                 self.screen.blit(self.assets['next_level'], (400, 500))
                 self.ui.render_next_level(self.screen, self.player.level),
                 self.ui.render_health(self.screen, self.player)
@@ -429,7 +455,7 @@ class Game:
 
         cursor_pos = pygame.mouse.get_pos()
         while True:
-            self.screen.blit(pygame.transform.scale(self.assets['inventory_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
+            self.screen.blit(scale(self.assets['inventory_screen'], (self.screen.get_width() - 200, self.screen.get_height() - 200)), (100,100))
             cursor_pos = pygame.mouse.get_pos()
 
             # Hover Over non-equipped weapons
@@ -444,19 +470,19 @@ class Game:
                 
             # equip weapon button redering
             if True not in non_equipped_weapons_render_stats:
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button_greyed_out'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
+                self.screen.blit(scale(self.assets['equip_button_greyed_out'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
             elif equip_weapon_button_rect.collidepoint(cursor_pos):
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button_hover'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
+                self.screen.blit(scale(self.assets['equip_button_hover'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
             else:
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
+                self.screen.blit(scale(self.assets['equip_button'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 260))
 
             # equip spell button rendering
             if True not in non_equipped_spells_render_stats:
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button_greyed_out'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
+                self.screen.blit(scale(self.assets['equip_button_greyed_out'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
             elif equip_spell_button_rect.collidepoint(cursor_pos):
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button_hover'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
+                self.screen.blit(scale(self.assets['equip_button_hover'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
             else:
-                self.screen.blit(pygame.transform.scale(self.assets['equip_button'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
+                self.screen.blit(scale(self.assets['equip_button'], (self.screen.get_width() - 660, self.screen.get_height() - 570)), (510, 310))
 
             # Weapons
             inventory_render_x_offset = 0
@@ -493,14 +519,14 @@ class Game:
             for non_equipped_weapon in enumerate(non_equipped_weapon_rects):
                 if non_equipped_weapons_render_stats[non_equipped_weapon[0]]:
                     pygame.draw.rect(self.screen, (100, 0, 0), non_equipped_weapon[1], 2)
-                    self.screen.blit(pygame.transform.scale(self.assets[self.player.weapon_inventory[non_equipped_weapon[0] + 1].weapon_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,120))
+                    self.screen.blit(scale(self.assets[self.player.weapon_inventory[non_equipped_weapon[0] + 1].weapon_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,120))
                     self.ui.render_weapon_name_stats(self.screen, self.player, self.player.weapon_inventory[non_equipped_weapon[0] + 1])
 
             # Non-Equipped Spell Stats
             for non_equipped_spell in enumerate(non_equipped_spell_rects):
                 if non_equipped_spells_render_stats[non_equipped_spell[0]]:
                     pygame.draw.rect(self.screen, (100, 0, 0), non_equipped_spell[1], 2)
-                    self.screen.blit(pygame.transform.scale(self.assets[self.player.spell_inventory[non_equipped_spell[0] + 1].spell_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,340))
+                    self.screen.blit(scale(self.assets[self.player.spell_inventory[non_equipped_spell[0] + 1].spell_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,340))
                     self.ui.render_spell_name_stats(self.screen, self.player, self.player.spell_inventory[non_equipped_spell[0] + 1])
 
             # If hover render lit up background
@@ -511,20 +537,20 @@ class Game:
 
             # Render Equipped Items
             if self.player.equipped_weapon is not None:
-                self.screen.blit(pygame.transform.scale(self.assets[self.player.equipped_weapon.weapon_type], (self.screen.get_width() - 620, self.screen.get_height() - 500)), (135,150))
+                self.screen.blit(scale(self.assets[self.player.equipped_weapon.weapon_type], (self.screen.get_width() - 620, self.screen.get_height() - 500)), (135,150))
             if self.player.equipped_spell is not None:
-                self.screen.blit(pygame.transform.scale(self.assets[self.player.equipped_spell.spell_type], (self.screen.get_width() - 620, self.screen.get_height() - 500)), (135,360))
+                self.screen.blit(scale(self.assets[self.player.equipped_spell.spell_type], (self.screen.get_width() - 620, self.screen.get_height() - 500)), (135,360))
 
             # Equipped Weapon Stats
             if self.display_equipped_weapon_details:
                 pygame.draw.rect(self.screen, (100, 0, 0), equipped_weapon_rect, 4)
-                self.screen.blit(pygame.transform.scale(self.assets[self.player.equipped_weapon.weapon_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,120))
+                self.screen.blit(scale(self.assets[self.player.equipped_weapon.weapon_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500,120))
                 self.ui.render_weapon_name_stats(self.screen, self.player, self.player.equipped_weapon)
             
             # Equipped Spell Stats
             if self.display_equipped_spell_details:
                 pygame.draw.rect(self.screen, (100, 0, 0), equipped_spell_rect, 4)
-                self.screen.blit(pygame.transform.scale(self.assets[self.player.equipped_spell.spell_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500, 340))
+                self.screen.blit(scale(self.assets[self.player.equipped_spell.spell_type], (self.screen.get_width() - 650, self.screen.get_height() - 530)), (500, 340))
                 self.ui.render_spell_name_stats(self.screen, self.player, self.player.equipped_spell)
 
             # Events
@@ -586,7 +612,7 @@ class Game:
     async def start_screen(self):
         self.screen.fill((0, 0, 0))
 
-        self.screen.blit(pygame.transform.scale(self.assets['title_screen'], self.screen.get_size()), (0,0))
+        self.screen.blit(scale(self.assets['title_screen'], self.screen.get_size()), (0,0))
 
         self.animation = self.assets['title_screen/animation']
 
@@ -602,7 +628,7 @@ class Game:
         pygame.display.update()
 
         while True:
-            self.screen.blit(pygame.transform.scale(self.animation.img(), self.screen.get_size()), (0,0))
+            self.screen.blit(scale(self.animation.img(), self.screen.get_size()), (0,0))
             cursor_pos = pygame.mouse.get_pos()
             if new_game_rect.collidepoint(cursor_pos):
                 self.screen.blit(self.assets['new_game_button_hover'], (self.screen.get_width() // 2 - self.assets['new_game_button_hover'].get_width() // 2, 400))
@@ -616,6 +642,12 @@ class Game:
             else:
                     self.screen.blit(self.assets['continue_button_greyed_out'], (self.screen.get_width() // 2 - self.assets['continue_button_greyed_out'].get_width() // 2, 450))
 
+            # Load the gameplay assets in the background, with a progress bar until they are all in
+            if not self.assets.load_pending(ASSETS_PER_FRAME):
+                bar_rect = pygame.Rect(self.screen.get_width() // 2 - 100, self.screen.get_height() - 30, 200, 4)
+                pygame.draw.rect(self.screen, (60, 60, 60), bar_rect)
+                pygame.draw.rect(self.screen, (200, 200, 200), (bar_rect.x, bar_rect.y, int(bar_rect.width * self.assets.progress()), bar_rect.height))
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
@@ -637,14 +669,43 @@ class Game:
 
 
     async def main(self):
+        self.load_level()
+
+        # Main Game Loop
+        while True:
+            self.profiler.begin_frame()
+            self.step()
+            self.render()
+            await self.handle_events()
+            self.profiler.mark('events')
+
+            # Update the display
+            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
+            self.profiler.mark('scale')
+            self.profiler.render(self.screen)
+            pygame.display.update()
+            self.profiler.mark('flip')
+            self.clock.tick(60)
+            self.profiler.mark('idle')
+            self.profiler.end_frame()
+            await asyncio.sleep(0)
+
+    # Sets up the level and every object in it, the seed (if any) is applied first so runs are reproducible
+    def load_level(self, level_path=DEFAULT_LEVEL):
+        if self.seed is not None:
+            random.seed(self.seed)
+        self.ticks = 0
+        # Whatever the title screen didn't get to, so nothing loads mid game
+        self.assets.load_all()
+
         # Initialize tilemap
         self.tilemap = Tilemap(self, tile_size=16)
-        self.tilemap.load()
-        self.all_tiles = self.tilemap.get_all_ordered_tiles()
-        self.non_ordered_tiles = self.tilemap.get_all_non_ordered_tiles()
+        self.tilemap.load(level_path)
 
         # Night overlay effect
         self.night_overlay = pygame.Surface(self.display.get_size(), pygame.SRCALPHA)
+        # What the night overlay was last drawn for, see render_night_overlay
+        self.night_overlay_state = None
         self.weather_system = Weather(self)
         # self.night_overlay.fill((0, 0, 0, 150))  # Recreate the night effect with alpha 150
 
@@ -656,6 +717,8 @@ class Game:
 
         # Enemies
         self.enemies = []
+        # Broad phase for collisions against enemies
+        self.enemy_hash = SpatialHash(cell_size=32)
         # Bonfires
         self.bonfires = []
         # chests
@@ -664,18 +727,14 @@ class Game:
         self.animated_physics_objects = []
         # Rendred first animated objects
         self.animated_objects = []
-        # lights
-        self.lights = []
-        # torch particle spawners
-        self.torch_particle_spawners = []
-        # smoke particle spawners
-        self.smoke_particle_spawners = []
-        # drop particle spawners
-        self.drop_particle_spawners = []
+        # lights that move (fireballs), applied every frame
+        self.lights = DynamicLights(self)
+        # lights that don't, baked once the level is loaded
+        self.light_map = LightMap(self)
         # Get all projectiless
         self.projectiles = []
-        # Get Particles
-        self.particles = []
+        # Get Particles, torch, bonfire smoke and soul drop emitters are added to it
+        self.particles = ParticleSystem(self)
         # drops
         self.drops = []
 
@@ -751,7 +810,8 @@ class Game:
                 if list(chest.pos) in data['open_chests'][self.tilemap.current_level]:
                     chest.is_opened = True
                 
-        elif os.path.isfile('save_files/save.json'):
+        # Headless runs never touch the save file
+        elif not self.headless and os.path.isfile('save_files/save.json'):
              data = {
             'max_health' : None,
             'max_stamina' : None,
@@ -771,246 +831,295 @@ class Game:
         self.ui = UI(self, self.player, self.player.equipped_weapon.weapon_type, self.player.equipped_spell.spell_type)
 
         # Get all light objects
-        for light in self.tilemap.extract([('light', 0), ('torch', 0)], keep=True):
+        for light in self.tilemap.lights:
             if light['type']== 'light':
-                self.lights.append(Light(self, light['pos'], 20, [20, 20, 0]))
+                self.light_map.add(Light(self, light['pos'], 20, [20, 20, 0]))
             elif light['type'] == 'torch':
-                self.lights.append(Light(self, light['pos'], 20, [40, 20, 0]))
-                self.torch_particle_spawners.append(pygame.rect.Rect(light['pos'][0], light['pos'][1], 16, 16))
+                self.light_map.add(Light(self, light['pos'], 20, [40, 20, 0]))
+                # Torch Ember Particles
+                self.particles.add_emitter(ParticleEmitter('torch_particle', pygame.rect.Rect(light['pos'][0], light['pos'][1], 16, 16), 0.5, spread=(0.15, 0.3), budget=8))
         
+        # Bonfire Smoke Particles
         for bonfire in self.bonfires:
-            self.smoke_particle_spawners.append(pygame.rect.Rect(bonfire.pos[0] + 8, bonfire.pos[1] - 18, 16, 16))
+            self.particles.add_emitter(ParticleEmitter('smoke_particle', pygame.rect.Rect(bonfire.pos[0] + 8, bonfire.pos[1] - 18, 16, 16), 0.5, velocity=(0, -0.2), budget=64))
+
+        self.light_map.bake()
+
+    # Advances the game by one tick, no rendering
+    def step(self, inputs=None):
+        """
+        :param inputs: This tick's inputs, a dict with held 'left', 'right', 'up', 'down' movement and one shot
+            'melee', 'cast_spell' and 'open_chest' actions. None keeps the current keyboard state.
+        """
+        self.ticks += 1
+
+        if inputs is not None:
+            self.movement_x[0] = inputs.get('left', False)
+            self.movement_x[1] = inputs.get('right', False)
+            self.movement_y[0] = inputs.get('up', False)
+            self.movement_y[1] = inputs.get('down', False)
+            if inputs.get('melee'):
+                self.player.melee()
+            if inputs.get('cast_spell'):
+                self.player.cast_spell()
+            if inputs.get('open_chest') and len(self.player.nearby_chest_objects) > 0:
+                self.player.open_chest()
+
+        self.scroll[0] += (self.player.physics_rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
+        self.scroll[1] += (self.player.physics_rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
+        self.render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+
+        path_misses = self.tilemap.path_cache.misses
+
+        # Update objects
+        self.player.update(self.movement_x, self.movement_y)
+
+        for enemy in self.enemies:
+            enemy.update()
+        self.profiler.mark('entities')
+        self.profiler.count('paths', self.tilemap.path_cache.misses - path_misses)
 
-        # Main Game Loop
-        while True:
-            self.scroll[0] += (self.player.physics_rect().centerx - self.display.get_width() / 2 - self.scroll[0]) / 30
-            self.scroll[1] += (self.player.physics_rect().centery - self.display.get_height() / 2 - self.scroll[1]) / 30
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-            self.display.fill((0, 0, 0))
+        for bonfire in self.bonfires:
+            bonfire.update()
 
-            # Update objects
-            self.player.update(self.movement_x, self.movement_y)
+        for chest in self.chests:
+            if chest.is_opened:
+                chest.update()
 
-            for enemy in self.enemies:
-                enemy.update()
+        for animated in self.animated_objects:
+            animated.update()
 
-            for bonfire in self.bonfires:
-                bonfire.update()
+        for animated in self.animated_physics_objects:
+            animated.update()
 
-            for chest in self.chests:
-                if chest.is_opened:
-                    chest.update()
+        self.lava_animated.update()
 
-            for animated in self.animated_objects:
-                animated.update()
+        self.water_animated.update()
 
-            for animated in self.animated_physics_objects:
-                animated.update()
+        for drop in self.drops:
+            drop.update()
+            # Add particle spawner if it's souls
+            if drop.has_particle_spawner == False and drop.__class__ == Souls:
+                drop.spawner = ParticleEmitter('soul_particle', pygame.rect.Rect(drop.pos[0] - 4, drop.pos[1] - 8, 8, 8), 0.25, velocity=(0, -0.2), budget=16)
+                self.particles.add_emitter(drop.spawner)
+                drop.has_particle_spawner = True
+        self.profiler.mark('objects')
 
-            self.lava_animated.update()
+        for projectile in self.projectiles[:]:
+            if projectile.update():  # If the projectile should be removed
+                self.projectiles.remove(projectile)
+        self.profiler.mark('projectiles')
 
-            self.water_animated.update()
+        # update weather system
+        self.weather_system.update()
+        self.profiler.mark('weather')
 
-            for drop in self.drops:
-                drop.update()
-                # Add particle spawner if it's souls
-                if drop.has_particle_spawner == False and drop.__class__ == Souls:
-                    drop.spawner = pygame.rect.Rect(drop.pos[0] - 4, drop.pos[1] - 8, 8, 8)
-                    self.drop_particle_spawners.append((drop.spawner, drop.__class__))
-                    drop.has_particle_spawner = True
-            
-            
-            # RENDERING
-            # Collect all tiles and objects to be rendered
-            self.render_order_objects = []
-            self.render_objects = []
-
-            # Add y-ordered tiles to ordered render list
-            for tile in self.all_tiles:
-                tile_pos = (tile['pos'][0] * self.tilemap.tile_size, tile['pos'][1] * self.tilemap.tile_size)
-                self.render_order_objects.append((tile, tile_pos[1]))
-                
-            # Add tiles to always be rendered first to list
-            for tile in self.non_ordered_tiles:
-                tile_pos = (tile['pos'][0] * self.tilemap.tile_size, tile['pos'][1] * self.tilemap.tile_size)
-                self.render_objects.append((tile, tile_pos[1]))
+        # Torch embers, bonfire smoke and soul drop particles from the emitters near the camera
+        self.particles.emit(pygame.Rect(self.render_scroll, self.display.get_size()))
 
-            # Add player to render list
-            self.render_order_objects.append((self.player, self.player.pos[1] - 8))
+        # animate particles
+        self.particles.update()
+        self.profiler.mark('particles')
 
-            # Add enemies to render list
-            for enemy in self.enemies:
-                self.render_order_objects.append((enemy, enemy.pos[1] - 8))
+    # Renders the current tick to the display surface
+    def render(self):
+        render_scroll = self.render_scroll
+        self.display.fill((0, 0, 0))
 
-            for bonfire in self.bonfires:
-                self.render_order_objects.append((bonfire, bonfire.pos[1]))
-            
-            for chest in self.chests:
-                self.render_order_objects.append((chest, chest.pos[1]))
+        # RENDERING
+        # Collect all tiles and objects to be rendered
+        self.render_order_objects = []
 
-            for projectile in self.projectiles[:]:
-                if projectile.update():  # If the projectile should be removed
-                    self.projectiles.remove(projectile)
-                else:
-                    self.render_order_objects.append((projectile, projectile.pos[1]))
+        # Add player to render list
+        self.render_order_objects.append((self.player, self.player.pos[1] - 8))
 
-            # Torches need to be rendered after walls
-            for animated in self.animated_objects:
-                if animated.type == 'torch':
-                    self.render_order_objects.append((animated, animated.pos[1]))
+        # Add enemies to render list
+        for enemy in self.enemies:
+            self.render_order_objects.append((enemy, enemy.pos[1] - 8))
 
-            for animated in self.animated_physics_objects:
+        for bonfire in self.bonfires:
+            self.render_order_objects.append((bonfire, bonfire.pos[1]))
+        
+        for chest in self.chests:
+            self.render_order_objects.append((chest, chest.pos[1]))
+
+        for projectile in self.projectiles:
+            self.render_order_objects.append((projectile, projectile.pos[1]))
+
+        # Torches need to be rendered after walls
+        for animated in self.animated_objects:
+            if animated.type == 'torch':
                 self.render_order_objects.append((animated, animated.pos[1]))
 
-            for drop in self.drops:
-                self.render_order_objects.append((drop, drop.original_pos[1] - 15)) # had - 17 here, because if it's behind a large objeect it can get screwed up
-
-            # Sort all render objects by their y-coordinate (top-down order)
-            self.render_order_objects.sort(key=lambda obj: obj[1])
-
-            # Render all non-ordered tiles not bridge
-            for obj, _ in self.render_objects:
-                if obj['type'] != 'bridge':
-                    self.tilemap.render_tile(self.display, obj, offset=render_scroll)
-
-            self.lava_animated.render(self.display, offset=render_scroll)
-
-            self.water_animated.render(self.display, offset=render_scroll)
-
-            # render animated objects
-            for animated in self.animated_objects:
-                animated.render(self.display, offset=render_scroll)
-
-            # render bridges
-            for obj, _ in self.render_objects:
-                if obj['type'] == 'bridge':
-                    self.tilemap.render_tile(self.display, obj, offset=render_scroll)
-
-            # Render all objects in sorted order
-            for obj, _ in self.render_order_objects:
-                if isinstance(obj, Player):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Enemy):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Projectile):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Bonfire):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Chest):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Animated):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, Drop):
-                    obj.render(self.display, offset=render_scroll)
-                elif isinstance(obj, dict):
-                    self.tilemap.render_tile(self.display, obj, offset=render_scroll)
-
-            # Render Interact Key Floater
-            for bonfire in self.player.nearby_bonfire_objects:
-                bonfire.render_interact(self.display, offset=render_scroll)
-
-             # Render Interact Key Floater
-            for chest in self.player.nearby_chest_objects:
-                chest.render_interact(self.display, offset=render_scroll)
-            
-            # update weather system
-            self.weather_system.update()
-            self.weather_system.render(self.display, offset=(0, 0))
-
-            # for projectile in self.projectiles[:]:
-            #     if projectile.update():  # If the projectile should be removed
-            #         self.projectiles.remove(projectile)
-            #     else:
-            #         projectile.render(self.display, offset=render_scroll)
-
-            # Render the lanterns to remove the night effect in their vicinity
-            for light in self.lights:
-                light.render(self.night_overlay, offset=render_scroll)
-            
-            # Torch Ember Particles
-            for rect in self.torch_particle_spawners:
-                if random.random() < 0.5:
-                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'torch_particle', pos, velocity=[random.uniform(-0.15, 0.15), random.uniform(-0.3, 0.3)], frame=random.randint(0, 10)))
-
-            # Bonfire Smoke Particles
-            for rect in self.smoke_particle_spawners:
-                if random.random() < 0.5:
-                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'smoke_particle', pos, velocity=[0, -0.2], frame=random.randint(0, 10)))
-            
-            # Drop Particles
-            for rect, drop_type in self.drop_particle_spawners:
-                # Soul Drop Particles
-                if random.random() < 0.25 and drop_type == Souls:
-                    pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                    self.particles.append(Particle(self, 'soul_particle', pos, velocity=[0, -0.2], frame=random.randint(0, 10)))
-
-            # animate and render particles
-            for particle in self.particles.copy():
-                kill = particle.update()
-                particle.render(self.display, offset=render_scroll)
-                if isinstance(particle, Particle) and particle.type == 'torch_particle':
-                    particle.pos[0] += math.sin(random.random()) * 0.3
-                    particle.pos[1] += math.sin(random.random()) * 0.3
-                elif isinstance(particle, Particle) and particle.type == 'smoke_particle':
-                     particle.pos[0] += math.sin(random.random()) * 0.7 * random.randint(-1, 1)
-                elif isinstance(particle, Particle) and particle.type == 'soul_particle':
-                    particle.pos[0] += math.sin(random.uniform(-1,1)) 
-                if kill:
-                    self.particles.remove(particle)
-
-
-            # Apply the night overlay effect after rendering everything
-            self.display.blit(self.night_overlay, (0, 0))
+        for animated in self.animated_physics_objects:
+            self.render_order_objects.append((animated, animated.pos[1]))
+
+        for drop in self.drops:
+            self.render_order_objects.append((drop, drop.original_pos[1] - 15)) # had - 17 here, because if it's behind a large objeect it can get screwed up
+
+        self.profiler.mark('render_list')
+
+        # Merge the objects with the visible y-ordered tiles (top-down order)
+        self.render_order_objects = self.tilemap.render_queue(self.render_order_objects, render_scroll, self.display.get_size())
+        self.profiler.mark('sort')
+
+        # Render pre-baked ground chunks
+        self.profiler.count('tile_blits', self.tilemap.render_chunks(self.display, 'ground', offset=render_scroll))
+        self.profiler.mark('tiles')
+
+        self.profiler.count('animated_blits', self.lava_animated.render(self.display, offset=render_scroll))
+
+        self.profiler.count('animated_blits', self.water_animated.render(self.display, offset=render_scroll))
+
+        # render animated objects
+        for animated in self.animated_objects:
+            animated.render(self.display, offset=render_scroll)
+        self.profiler.mark('animated')
+
+        # render pre-baked bridge chunks
+        self.profiler.count('tile_blits', self.tilemap.render_chunks(self.display, 'bridge', offset=render_scroll))
+        self.profiler.mark('tiles')
+
+        # Render all objects in sorted order
+        for obj, _ in self.render_order_objects:
+            if isinstance(obj, Player):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Enemy):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Projectile):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Bonfire):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Chest):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Animated):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, Drop):
+                obj.render(self.display, offset=render_scroll)
+            elif isinstance(obj, dict):
+                self.tilemap.render_tile(self.display, obj, offset=render_scroll)
+        self.profiler.count('sorted_blits', len(self.render_order_objects))
+
+        # Render Interact Key Floater
+        for bonfire in self.player.nearby_bonfire_objects:
+            bonfire.render_interact(self.display, offset=render_scroll)
+
+         # Render Interact Key Floater
+        for chest in self.player.nearby_chest_objects:
+            chest.render_interact(self.display, offset=render_scroll)
+        
+        self.profiler.mark('sorted_blits')
 
-            # Render the UI on top of everything
-            self.ui.render(self.display, render_scroll)
+        # render weather system
+        self.weather_system.render(self.display, offset=(0, 0))
+        self.profiler.mark('weather_render')
 
-            # EVENT HANDLING
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        self.movement_x[0] = True
-                    if event.key == pygame.K_RIGHT:
-                        self.movement_x[1] = True
-                    if event.key == pygame.K_UP:
-                        self.movement_y[0] = True
-                    if event.key == pygame.K_DOWN:
-                        self.movement_y[1] = True
-                    if event.key == pygame.K_q:
-                        self.player.melee()
-                    if event.key == pygame.K_e: 
-                        self.player.cast_spell()
-                    if event.key == pygame.K_f:
-                        if len(self.player.nearby_bonfire_objects)  >  0:
-                            self.clear_movement()
-                            await self.player.rest_at_bonfire()
-                        if len(self.player.nearby_chest_objects) > 0:
-                            self.player.open_chest()
-                    if event.key == pygame.K_i:
+        # Render the lanterns to remove the night effect in their vicinity
+        self.render_night_overlay(render_scroll)
+        self.profiler.mark('lights')
+
+        # render particles
+        self.profiler.count('particle_blits', self.particles.render(self.display, offset=render_scroll))
+        self.profiler.mark('particles_render')
+
+        # Apply the night overlay effect after rendering everything, there is none during the day
+        if self.weather_system.night_overlay_opacity > 0:
+            self.display.blit(self.night_overlay, (0, 0))
+
+        # Render the UI on top of everything
+        self.ui.render(self.display, render_scroll)
+        self.profiler.mark('ui')
+        self.profiler.count('particles', len(self.particles))
+        self.profiler.count('lights', len(self.lights))
+        self.profiler.count('enemies', len(self.enemies))
+        self.profiler.count('projectiles', len(self.projectiles))
+
+    # Draws the night overlay: darkness at the current opacity with the lights taken out of it
+    def render_night_overlay(self, render_scroll):
+        opacity = self.weather_system.night_overlay_opacity
+        if opacity <= 0:
+            self.night_overlay_state = None
+            return
+
+        # Static lights only move with the camera, so the overlay is only redrawn when the opacity, the camera or a
+        # moving light on screen changed since last frame
+        visible_lights = self.lights.visible(self.display.get_rect(), render_scroll)
+        state = (opacity, render_scroll, [(tuple(light.pos), light.size) for light in visible_lights])
+        if state == self.night_overlay_state:
+            return
+        self.night_overlay_state = state
+
+        self.night_overlay.fill((0, 0, 0, opacity))
+        self.light_map.render(self.night_overlay, offset=render_scroll)
+        for light in visible_lights:
+            light.apply(self.night_overlay, render_scroll)
+
+    async def handle_events(self):
+        # EVENT HANDLING
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    self.movement_x[0] = True
+                if event.key == pygame.K_RIGHT:
+                    self.movement_x[1] = True
+                if event.key == pygame.K_UP:
+                    self.movement_y[0] = True
+                if event.key == pygame.K_DOWN:
+                    self.movement_y[1] = True
+                if event.key == pygame.K_q:
+                    self.player.melee()
+                if event.key == pygame.K_e: 
+                    self.player.cast_spell()
+                if event.key == pygame.K_f:
+                    if len(self.player.nearby_bonfire_objects)  >  0:
                         self.clear_movement()
-                        await self.inventory_screen()
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_LEFT:
-                        self.movement_x[0] = False
-                    if event.key == pygame.K_RIGHT:
-                        self.movement_x[1] = False
-                    if event.key == pygame.K_UP:
-                        self.movement_y[0] = False
-                    if event.key == pygame.K_DOWN:
-                        self.movement_y[1] = False
-                
+                        await self.player.rest_at_bonfire()
+                    if len(self.player.nearby_chest_objects) > 0:
+                        self.player.open_chest()
+                if event.key == pygame.K_i:
+                    self.clear_movement()
+                    await self.inventory_screen()
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                if event.key == pygame.K_F4:
+                    self.profiler.dump('profile_trace.json')
+                    self.profiler.dump('profile_trace.csv')
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_LEFT:
+                    self.movement_x[0] = False
+                if event.key == pygame.K_RIGHT:
+                    self.movement_x[1] = False
+                if event.key == pygame.K_UP:
+                    self.movement_y[0] = False
+                if event.key == pygame.K_DOWN:
+                    self.movement_y[1] = False
+
+    def run_headless(self, ticks, inputs=None, render=False):
+        """
+        Simulate a number of ticks as fast as possible, loading the level first if needed.
+
+        :param ticks: Number of ticks to simulate.
+        :param inputs: Optional list of per-tick inputs passed to step, e.g. a recorded session to replay.
+        :param render: Also render every tick to the display surface.
+        """
+        if self.tilemap is None:
+            self.load_level()
+        for tick in range(ticks):
+            self.profiler.begin_frame()
+            self.step(inputs[tick] if inputs is not None and tick < len(inputs) else None)
+            if render:
+                self.render()
+            self.profiler.end_frame()
+
+    # Milliseconds since start up, simulated from the tick count in headless mode so runs don't depend on wall time
+    def get_ticks(self):
+        if self.headless:
+            return self.ticks * 1000 // 60
+        return pygame.time.get_ticks()
 
-            # Update the display
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-            pygame.display.update()
-            self.clock.tick(60)
-            await asyncio.sleep(0)
-    
     def clear_movement(self):
         self.movement_x[0] = False
         self.movement_x[1] = False
@@ -1018,4 +1127,5 @@ class Game:
         self.movement_y[1] = False
 
 
-asyncio.run(Game().run())
\ No newline at end of file
+if __name__ == '__main__':
+    asyncio.run(Game().run())
\ No newline at end of file
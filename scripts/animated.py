@@ -30,6 +30,6 @@ class Animated:
             self.pos[1] // 16 > self.game.player.pos[1] // 16 - 12 and
             self.pos[1] // 16 < self.game.player.pos[1] // 16 + 12
             ):
-            surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), 
+            surf.blit(self.animation.img(self.flip), 
                     (self.pos[0] - offset[0] + self.anim_offset[0], 
                     self.pos[1] - offset[1] + self.anim_offset[1]))
\ No newline at end of file
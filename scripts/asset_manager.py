@@ -0,0 +1,79 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.utils import preload_atlases, release_atlas_sheets
+
+# No threads in the browser build, everything is loaded on the main thread there
+THREADS_AVAILABLE = sys.platform != 'emscripten'
+
+
+class AssetManager:
+    """
+    Game assets by name, each created by its loader the first time it is used.
+
+    Atlas sheets are decoded up front on a thread pool (pygame releases the GIL while decoding), converting a sheet
+    and slicing its images out still happens on the main thread since it needs the display. Assets nobody asked for
+    yet can be loaded a few at a time with load_pending (e.g. while the title screen animates) or all at once with
+    load_all before gameplay starts.
+    """
+    def __init__(self, loaders, workers=4):
+        """
+        :param loaders: Dict of asset name to the function that loads it, the order is the background loading order.
+        :param workers: Decode threads, 0 to decode on the main thread when a sheet is first needed.
+        """
+        self.loaders = loaders
+        self.assets = {}
+        self.pending = list(loaders)
+        self.executor = ThreadPoolExecutor(workers) if workers and THREADS_AVAILABLE else None
+
+    def preload(self):
+        """
+        Start decoding every atlas sheet in the background.
+        """
+        if self.executor is not None:
+            preload_atlases(self.executor)
+
+    def __getitem__(self, name):
+        if name not in self.assets:
+            self.assets[name] = self.loaders[name]()
+        return self.assets[name]
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+    def get(self, name, default=None):
+        if name not in self.loaders:
+            return default
+        return self[name]
+
+    def keys(self):
+        return self.loaders.keys()
+
+    def load_pending(self, count=None):
+        """
+        Load assets that have not been used yet, in loader order.
+
+        :param count: Most assets to load in this call, all of them if None.
+        :return: True once every asset is loaded.
+        """
+        while self.pending and (count is None or count > 0):
+            name = self.pending.pop(0)
+            if name not in self.assets:
+                self.assets[name] = self.loaders[name]()
+                if count is not None:
+                    count -= 1
+        return not self.pending
+
+    def load_all(self):
+        self.load_pending()
+        # Everything is copied out of the sheets by now
+        release_atlas_sheets()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def progress(self):
+        """
+        :return: Fraction of the assets loaded so far.
+        """
+        return len(self.assets) / len(self.loaders) if self.loaders else 1
@@ -4,6 +4,7 @@ import random
 import json
 
 from scripts.light import Light
+from scripts.utils import flip
 from scripts.drop import Drop
 from scripts.drop import Souls
 
@@ -66,13 +67,13 @@ class Chest:
         self.animation.update()
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), 
+        surf.blit(self.animation.img(self.flip), 
                 (self.pos[0] - offset[0] + self.anim_offset[0], 
                 self.pos[1] - offset[1] + self.anim_offset[1]))
         
     def render_interact(self, surf, offset=(0,0)):
         if not self.is_opened:
             offset = (offset[0], offset[1] + 18)
-            surf.blit(pygame.transform.flip(self.game.assets['f_key'].copy(), self.flip, False), 
+            surf.blit(flip(self.game.assets['f_key'], self.flip, False), 
                 (self.pos[0] - offset[0] + self.anim_offset[0], 
                 self.pos[1] - offset[1] + self.anim_offset[1]))
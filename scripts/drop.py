@@ -82,10 +82,10 @@ class Souls(Drop):
             (self.center[1] - self.game.player.pos[1]) // self.tile_size
                             ] 
         
-        if (self.distance[0] > -1 and self.distance[0] < 1 and self.distance[1] > -1 and self.distance[1] < 1) and (self.spawner, self.__class__) in self.game.drop_particle_spawners:
+        if (self.distance[0] > -1 and self.distance[0] < 1 and self.distance[1] > -1 and self.distance[1] < 1) and self.spawner in self.game.particles.emitters:
             self.game.player.souls += self.souls
             self.game.drops.remove(self)
-            self.game.drop_particle_spawners.remove((self.spawner, self.__class__))
+            self.game.particles.remove_emitter(self.spawner)
         
     def render(self, surf, offset = (0,0)):
         super().render(surf, offset)
@@ -2,7 +2,6 @@ import pygame
 import random
 import sys
 import json
-from collections import deque
 
 
 from scripts.drop import Drop, Souls
@@ -10,6 +9,7 @@ from scripts.tilemap import Tilemap
 from scripts.weapon import Weapon
 from scripts.spell import Spell
 from scripts.projectile import Projectile, FireballSpell
+from scripts.utils import flip
 
 import asyncio
 
@@ -36,9 +36,11 @@ class PhysicsEntity:
         self.set_action('idle_down')
     
     def damage_rect(self):
+        self.game.profiler.count('rects')
         return pygame.Rect(self.pos[0] + self.damage_offset_x, self.pos[1] + self.damage_offset_y, self.damage_hitbox[0], self.damage_hitbox[1])
     
     def physics_rect(self):
+        self.game.profiler.count('rects')
         return pygame.Rect(self.pos[0] + self.physics_offset_x, self.pos[1] + self.physics_offset_y, self.physics_hitbox[0], self.physics_hitbox[1])
 
     def set_action(self, action):
@@ -117,6 +119,8 @@ class PhysicsEntity:
 
     def die(self):
         self.game.enemies.remove(self)
+        self.game.enemy_hash.remove(self)
+        self.game.tilemap.remove_entity_occupancy(self)
         self.game.player.souls += self.souls
 
     def melee(self):
@@ -158,7 +162,7 @@ class PhysicsEntity:
                     self.patrol_counter = 1
 
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), 
+        surf.blit(self.animation.img(self.flip), 
                   (self.pos[0] - offset[0] + self.anim_offset[0], 
                    self.pos[1] - offset[1] + self.anim_offset[1]))
 
@@ -312,24 +316,26 @@ class Player(PhysicsEntity):
             self.attack_cooldown -= 1
 
         if self.stamina < self.max_stamina and self.stamina_recovery_start:
-            time_since_last_melee = pygame.time.get_ticks() - self.stamina_recovery_start
+            time_since_last_melee = self.game.get_ticks() - self.stamina_recovery_start
             if time_since_last_melee >= self.stamina_regen_cooldown:
                 self.stamina = min(self.max_stamina, self.stamina + self.stamina_regen_rate)
 
         if self.mana < self.max_mana and self.mana_recovery_start:
-            time_since_last_spell = pygame.time.get_ticks() - self.mana_recovery_start
+            time_since_last_spell = self.game.get_ticks() - self.mana_recovery_start
             if time_since_last_spell >= self.mana_regen_cooldown:
                 self.mana = min(self.max_mana, self.mana + self.mana_regen_rate)
 
-        self.game.tilemap.insert_entity_into_physics_tilemap(self.pos, 'player')
+        self.game.tilemap.update_entity_occupancy(self, self.pos)
 
         # Handle Death
         if self.health <= 0:
             self.die()
 
     def die(self):
+        for drop in self.game.drops:
+            if drop.spawner is not None:
+                self.game.particles.remove_emitter(drop.spawner)
         self.game.drops.clear()
-        self.game.drop_particle_spawners.clear()
         if self.souls > 0:
             self.game.drops.append(Souls(self.game, self.pos.copy(), 'souls', self.game.assets['dropped_souls'], self.souls))
             self.souls = 0
@@ -393,13 +399,13 @@ class Player(PhysicsEntity):
             super().melee()
 
             self.stamina -= self.equipped_weapon.stamina_cost
-            self.stamina_recovery_start = pygame.time.get_ticks()
+            self.stamina_recovery_start = self.game.get_ticks()
 
             # Set the melee attack duration to 10 frames
             self.melee_attack_duration = 10
             self.is_melee_attacking = True
 
-            for enemy in self.game.enemies:
+            for enemy in self.game.enemy_hash.query_rect(self.melee_hitbox):
                 if self.melee_hitbox and self.melee_hitbox.colliderect(enemy.damage_rect()):
                     enemy.health -= self.equipped_weapon.damage
                     knockback_vector = [enemy.pos[0] - self.pos[0], enemy.pos[1] - self.pos[1]]
@@ -432,7 +438,7 @@ class Player(PhysicsEntity):
                 pass
 
             self.mana -= self.equipped_spell.mana_cost
-            self.mana_recovery_start = pygame.time.get_ticks()
+            self.mana_recovery_start = self.game.get_ticks()
 
     def render(self, surf, offset=(0, 0)):
 
@@ -468,7 +474,7 @@ class Player(PhysicsEntity):
                 flip_vertically = False
 
             # Flip the weapon image based on direction
-            weapon_image = pygame.transform.flip(weapon_image, flip_horizontally, flip_vertically)
+            weapon_image = flip(weapon_image, flip_horizontally, flip_vertically)
             
             # Align the weapon position with the melee hitbox
             weapon_pos = (self.melee_hitbox.x - offset[0], self.melee_hitbox.y - offset[1])
@@ -483,7 +489,7 @@ class Player(PhysicsEntity):
 
         # Render the player sprite
         surf.blit(
-            pygame.transform.flip(self.animation.img(), self.flip, False),
+            self.animation.img(self.flip),
             (self.pos[0] - offset[0] + self.anim_offset[0],
             self.pos[1] - offset[1] + self.anim_offset[1])
         )
@@ -527,6 +533,11 @@ class Enemy(PhysicsEntity):
         self.pursuit_direction = None
         self.start = None
         self.next = None
+        self.game.enemy_hash.insert(self, self.hash_rect())
+
+    # Rect registered in the game's enemy spatial hash, covers both the damage and physics hitboxes
+    def hash_rect(self):
+        return pygame.Rect(self.pos[0], self.pos[1], 16, 16)
 
     def update(self, movement_x=(0, 0), movement_y=(0, 0)):
         if self.knockback_remaining > 0:
@@ -547,8 +558,8 @@ class Enemy(PhysicsEntity):
             if distance < 75 or (distance < 100 and self.pursuit):
                 self.pursuit = True
                 if self.path is None or self.path[len(self.path) - 1] != ((self.game.player.pos[1] + 4) // 16, (self.game.player.pos[0] + 7) // 16):
-                    tilemap = self.game.tilemap.insert_entity_into_physics_tilemap(self.pos, 'enemy')
-                    self.path = self.construct_path(tilemap)
+                    self.game.tilemap.update_entity_occupancy(self, self.pos)
+                    self.path = self.construct_path()
                     self.pursuit_direction = None
                 else:
                     if len(self.path) >= 2 and not self.traveling:
@@ -690,7 +701,8 @@ class Enemy(PhysicsEntity):
             self.apply_damage_to_player()
             self.apply_knockback_to_player()
 
-        for enemy in self.game.enemies:
+        # Candidates within a hitbox of this enemy, prevent_overlap can push it into a neighbouring enemy
+        for enemy in self.game.enemy_hash.query_rect(self.physics_rect().inflate(32, 32)):
             if enemy != self and self.physics_rect().colliderect(enemy.physics_rect()):
                 self.prevent_overlap(enemy)
 
@@ -698,67 +710,23 @@ class Enemy(PhysicsEntity):
                 if self.knockback_remaining > 0:
                     self.apply_knockback_to_other_enemy(enemy)
 
+        self.game.enemy_hash.move(self, self.hash_rect())
+
         if self.health <= 0:
             self.die()
 
-    # BFS algorithm for finding path from 3 to 2 in physcis_tilemap
-    def find_start_and_target(self, physics_tilemap):
-        start = None
-        target = None
-        for i in range(len(physics_tilemap)):
-            for j in range(len(physics_tilemap[i])):
-                if physics_tilemap[i][j] == 3:
-                    start = (i, j)
-                if physics_tilemap[i][j] == 2:
-                    target = (i, j)
+    # Start (this enemy) and target (player) tiles from the tilemap's occupancy layer
+    def find_start_and_target(self):
+        start = self.game.tilemap.entity_cells.get(self)
+        target = self.game.tilemap.entity_cells.get(self.game.player)
         return start, target
     
-    # BFS algorithm for finding path from 3 to 2 in physcis_tilemap
-    def bfs(self, physics_tilemap, start, target):
-        if start is None or target is None:
-            return None  # Return if either start or target is not found
-
-        rows, cols = len(physics_tilemap), len(physics_tilemap[0])
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # Up, down, left, right
-        queue = deque([start])
-        visited = set([start])
-        parent = {start: None}
-
-        while queue:
-            current = queue.popleft()
-
-            # Stop if the current node is the target
-            if current == target:
-                path = []
-                step = target
-                while step is not None:
-                    path.append(step)
-                    step = parent[step]
-                path.reverse()
-                return path  # Return the path from start to target
-
-            # Explore neighbors
-            for direction in directions:
-                new_row, new_col = current[0] + direction[0], current[1] + direction[1]
-                new_position = (new_row, new_col)
-
-                # Check if the new position is within bounds, has not been visited, and is not an impassable cell (1)
-                if (0 <= new_row < rows and 0 <= new_col < cols and
-                        new_position not in visited and physics_tilemap[new_row][new_col] != 1):
-                    
-                    queue.append(new_position)
-                    visited.add(new_position)
-                    parent[new_position] = current
-
-        # If we exhaust the queue and do not find the target, return None
-        return None
-        
-
-    def construct_path(self, physics_tilemap):
-        start, target = self.find_start_and_target(physics_tilemap)
+    # Follow the tilemap's shared flow field from this enemy's tile to the player's tile
+    def construct_path(self):
+        start, target = self.find_start_and_target()
         if not start or not target:
             return None
-        return self.bfs(physics_tilemap, start, target)
+        return self.game.tilemap.path_to_player(start)
 
     def apply_knockback(self, knockback_vector, knockback_strength):
         distance = max(1, (knockback_vector[0] ** 2 + knockback_vector[1] ** 2) ** 0.5)
@@ -853,7 +821,7 @@ class Enemy(PhysicsEntity):
         # )
 
         surf.blit(
-            pygame.transform.flip(self.animation.img(), self.flip, False),
+            self.animation.img(self.flip),
             (self.pos[0] - offset[0] + self.anim_offset[0],
              self.pos[1] - offset[1] + self.anim_offset[1])
         )
\ No newline at end of file
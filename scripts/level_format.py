@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+from array import array
+
+try:
+    import mmap
+except ImportError:
+    # Not available in the browser build, the file is read into memory instead
+    mmap = None
+
+# Compiled level file layout (little endian):
+#   header  - magic, format version, index size
+#   index   - JSON describing the map (size, layers, variant tables, source hash) and where each section starts
+#   data    - the sections, raw arrays back to back:
+#       'cells/<index>'   uint32 cell indexes (y * width + x) of the layer's tiles, in row order
+#       'variants/<index>' uint16 variant of each of those tiles
+#       'physics'         uint8 per cell, 1 if the cell blocks pathfinding
+#       'objects/<name>'  uint16 x, y pairs of the object layer spawn positions
+#       'animated/<name>' uint16 x, y pairs of the animated layer positions
+#       'lights'          uint16 x, y, kind triples, kind indexes the index's light types
+MAGIC = b'DILV'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+
+# Extension of compiled levels, written next to the TMX they were compiled from
+EXTENSION = '.lvl'
+
+TYPECODES = {
+    'I': 4,
+    'H': 2,
+    'B': 1,
+}
+
+
+def compiled_path(path):
+    """
+    :return: Path of the compiled level for a TMX path (unchanged if it already is one).
+    """
+    return os.path.splitext(path)[0] + EXTENSION
+
+
+def source_hash(path):
+    with open(path, 'rb') as source_file:
+        return hashlib.sha1(source_file.read()).hexdigest()
+
+
+def is_up_to_date(path):
+    """
+    Check whether a TMX has a compiled level that can be loaded instead.
+
+    The compiled level is trusted as is when the TMX is not there (e.g. only compiled levels were shipped), otherwise
+    it is only used if it was compiled from the TMX's current contents.
+    """
+    level_path = compiled_path(path)
+    if not os.path.isfile(level_path):
+        return False
+    if path == level_path or not os.path.isfile(path):
+        return True
+    try:
+        return read_index(level_path)['source_sha1'] == source_hash(path)
+    except (ValueError, KeyError, OSError):
+        return False
+
+
+def _pack(typecode, values):
+    data = array(typecode, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def write(path, width, height, layers, variant_tables, physics_tilemap, object_layers, animated_layers, lights, source_sha1=None):
+    """
+    Write a compiled level.
+
+    :param layers: List of (layer name, list of (cell index, variant) of its tiles in row order) in layer order.
+    :param variant_tables: Dict of layer name to the list of gids, a tile's variant being its gid's index in it.
+    :param physics_tilemap: 2D [row][col] list of 0/1 pathfinding blockers.
+    :param object_layers: Dict of object layer name to the list of (x, y) spawn tile positions.
+    :param animated_layers: Dict of animated layer name to the list of (x, y) tile positions.
+    :param lights: List of (x, y, tile type) of the lights, in pixels.
+    """
+    sections = []
+    index = {
+        'width': width,
+        'height': height,
+        'layers': [name for name, tiles in layers],
+        'variant_tables': variant_tables,
+        'light_types': sorted({light[2] for light in lights}),
+        'source_sha1': source_sha1,
+        'sections': {},
+    }
+    for layer_index, (name, tiles) in enumerate(layers):
+        sections.append(('cells/' + str(layer_index), 'I', [index for index, variant in tiles]))
+        sections.append(('variants/' + str(layer_index), 'H', [variant for index, variant in tiles]))
+    sections.append(('physics', 'B', [blocked for row in physics_tilemap for blocked in row]))
+    for name, positions in object_layers.items():
+        sections.append(('objects/' + name, 'H', [value for pos in positions for value in pos]))
+    for name, positions in animated_layers.items():
+        sections.append(('animated/' + name, 'H', [value for pos in positions for value in pos]))
+    sections.append(('lights', 'H', [value for x, y, light_type in lights for value in (x, y, index['light_types'].index(light_type))]))
+
+    offset = 0
+    for name, typecode, values in sections:
+        index['sections'][name] = [offset, typecode, len(values)]
+        offset += len(values) * TYPECODES[typecode]
+    index_data = json.dumps(index, separators=(',', ':')).encode('utf-8')
+
+    with open(path, 'wb') as level_file:
+        level_file.write(HEADER.pack(MAGIC, VERSION, len(index_data)))
+        level_file.write(index_data)
+        for name, typecode, values in sections:
+            level_file.write(_pack(typecode, values))
+    return path
+
+
+def read_index(path):
+    with open(path, 'rb') as level_file:
+        magic, version, index_size = HEADER.unpack(level_file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} compiled level')
+        return json.loads(level_file.read(index_size).decode('utf-8'))
+
+
+class CompiledLevel:
+    """
+    Read only view of a compiled level, memory mapped where mmap is available.
+
+    Sections are sliced out of the mapping lazily, nothing is copied until a section is asked for.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as level_file:
+            if mmap is not None:
+                self.buffer = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.buffer = level_file.read()
+        magic, version, index_size = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {VERSION} compiled level')
+        self.index = json.loads(bytes(self.buffer[HEADER.size:HEADER.size + index_size]).decode('utf-8'))
+        self.data_start = HEADER.size + index_size
+        self.width = self.index['width']
+        self.height = self.index['height']
+        self.layers = self.index['layers']
+        self.variant_tables = self.index['variant_tables']
+
+    def section(self, name):
+        """
+        :return: The section as an array ('I', 'H' or 'B'), empty if the level has no such section.
+        """
+        if name not in self.index['sections']:
+            return array('H')
+        offset, typecode, count = self.index['sections'][name]
+        start = self.data_start + offset
+        data = array(typecode)
+        data.frombytes(self.buffer[start:start + count * TYPECODES[typecode]])
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return data
+
+    def layer(self, layer_index):
+        """
+        :return: (cell indexes, variants) arrays of a layer's tiles.
+        """
+        return self.section('cells/' + str(layer_index)), self.section('variants/' + str(layer_index))
+
+    def physics_tilemap(self):
+        physics = self.section('physics')
+        return [list(physics[row * self.width:(row + 1) * self.width]) for row in range(self.height)]
+
+    def positions(self, name):
+        values = self.section(name)
+        return [(values[i], values[i + 1]) for i in range(0, len(values), 2)]
+
+    def lights(self):
+        values = self.section('lights')
+        light_types = self.index['light_types']
+        return [(values[i], values[i + 1], light_types[values[i + 2]]) for i in range(0, len(values), 3)]
+
+    def close(self):
+        if mmap is not None and isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = None
@@ -1,6 +1,31 @@
 import pygame
 import json
 
+# Size in pixels of the chunks static lights are baked into
+LIGHT_CHUNK_SIZE = 128
+
+# (size, (r, g, b)) -> light mask, see get_light_mask
+light_masks = {}
+
+
+def get_light_mask(size, color):
+    """
+    Radial gradient light mask, drawn once per size and colour and shared by every light using it.
+    """
+    key = (size, tuple(color))
+    if key not in light_masks:
+        # Create a light mask with a gradient (100x100 size for a 50-pixel radius light)
+        light_mask = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+
+        # Draw a radial gradient circle on the light mask
+        for r in range(size, 0, -1):
+            alpha = int(255 * (1 - r / size))
+            if alpha < 0:  # Calculate alpha value (0 at center to 255 at edge)
+                alpha *= - 1
+            pygame.draw.circle(light_mask, (color[0], color[1], color[2], alpha), (size, size), r)
+        light_masks[key] = light_mask
+    return light_masks[key]
+
 class Light:
     def __init__(self, game, pos, size, color):
         self.game = game
@@ -9,24 +34,123 @@ class Light:
         self.red = color[0]
         self.green = color[1]
         self.blue = color[2]
+        self.light_mask = get_light_mask(size, color)
 
-        # self.size = size
+    def move(self, pos, size=None):
+        """
+        Move the light, and resize it if a size is given.
+        """
+        self.pos = pos
+        if size is not None and size != self.size:
+            self.size = size
+            self.light_mask = get_light_mask(size, (self.red, self.green, self.blue))
+
+    def rect(self, offset=(0, 0)):
+        """
+        :return: Area the light mask covers when applied with this offset, world pixels by default.
+        """
+        # Truncated like blit truncates the mask's position
+        return pygame.Rect(int(self.pos[0] - offset[0] - self.size + 8), int(self.pos[1] - offset[1] - self.size + 8), self.size * 2, self.size * 2)
+
+    def apply(self, overlay, offset=(0, 0)):
+        # Correctly calculate the position to blit the light mask, centered on the lantern
+        light_x= self.pos[0] - offset[0] - self.size + 8 # Adjust by half the light mask width
+        light_y = self.pos[1] - offset[1] - self.size + 8 # Adjust by half the light mask height
+        overlay.blit(self.light_mask, (light_x, light_y), special_flags=pygame.BLEND_RGBA_SUB)
+        overlay.blit(self.light_mask, (light_x, light_y), special_flags=pygame.BLEND_RGB_ADD)
 
-        # Create a light mask with a gradient (100x100 size for a 50-pixel radius light)
-        self.light_mask = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        
-        # Draw a radial gradient circle on the light mask
-        for r in range(self.size, 0, -1):
-            alpha = int(255 * (1 - r / self.size))
-            if alpha < 0:  # Calculate alpha value (0 at center to 255 at edge)
-                alpha *= - 1
-            pygame.draw.circle(self.light_mask, (self.red, self.green, self.blue, alpha), (self.size, self.size), r)
+
+class LightMap:
+    """
+    Lights that never move (lamps, torches, bonfires) baked into chunks of one combined light mask.
+
+    Applying a light subtracts its mask's alpha from the night overlay and then takes the brighter of the overlay's and
+    the mask's colour. On the freshly filled (black) overlay that makes the outcome of any set of lights the sum of
+    their alphas and the brightest of their colours, whatever the order or the overlay's opacity. So the lights are
+    baked once at load time and each frame costs two blits per chunk on screen, not two per light on the level.
+    """
+    def __init__(self, game, chunk_size=LIGHT_CHUNK_SIZE):
+        self.game = game
+        self.chunk_size = chunk_size
+        self.lights = []
+        # (chunk x, chunk y) -> baked mask, only for chunks some light reaches
+        self.chunks = {}
+        self.baked = True
+
+    def add(self, light):
+        self.lights.append(light)
+        self.baked = False
+
+    def bake(self):
+        # Apply the lights to fully opaque chunks the way they are applied to the overlay, which leaves each pixel with
+        # its combined colour and 255 - its combined alpha
+        applied = {}
+        for light in self.lights:
+            rect = light.rect()
+            for chunk_y in range(rect.top // self.chunk_size, (rect.bottom - 1) // self.chunk_size + 1):
+                for chunk_x in range(rect.left // self.chunk_size, (rect.right - 1) // self.chunk_size + 1):
+                    if (chunk_x, chunk_y) not in applied:
+                        chunk = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+                        chunk.fill((0, 0, 0, 255))
+                        applied[(chunk_x, chunk_y)] = chunk
+                    light.apply(applied[(chunk_x, chunk_y)], (chunk_x * self.chunk_size, chunk_y * self.chunk_size))
+
+        # Turn those into a single mask per chunk: the combined colour with the combined alpha
+        self.chunks = {}
+        for loc, chunk in applied.items():
+            mask = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+            mask.fill((0, 0, 0, 255))
+            mask.blit(chunk, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
+            mask.blit(chunk, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+            self.chunks[loc] = mask
+        self.baked = True
 
     def render(self, overlay, offset=(0, 0)):
-    
-        if self.game.weather_system.night_overlay_opacity > 0:
-            # Correctly calculate the position to blit the light mask, centered on the lantern
-            light_x= self.pos[0] - offset[0] - self.size + 8 # Adjust by half the light mask width
-            light_y = self.pos[1] - offset[1] - self.size + 8 # Adjust by half the light mask height
-            overlay.blit(self.light_mask, (light_x, light_y), special_flags=pygame.BLEND_RGBA_SUB)
-            overlay.blit(self.light_mask, (light_x, light_y), special_flags=pygame.BLEND_RGB_ADD)
+        if self.game.weather_system.night_overlay_opacity <= 0:
+            return
+        if not self.baked:
+            self.bake()
+
+        width, height = overlay.get_size()
+        left, top = int(offset[0]), int(offset[1])
+        for chunk_y in range(top // self.chunk_size, (top + height - 1) // self.chunk_size + 1):
+            for chunk_x in range(left // self.chunk_size, (left + width - 1) // self.chunk_size + 1):
+                mask = self.chunks.get((chunk_x, chunk_y))
+                if mask is not None:
+                    pos = (chunk_x * self.chunk_size - left, chunk_y * self.chunk_size - top)
+                    overlay.blit(mask, pos, special_flags=pygame.BLEND_RGBA_SUB)
+                    overlay.blit(mask, pos, special_flags=pygame.BLEND_RGB_ADD)
+
+
+class DynamicLights:
+    """
+    Lights that move (fireballs), applied to the night overlay every frame they are on screen.
+
+    Whoever moves a light creates it once, moves it every frame and releases it when done, instead of building a new
+    light each frame.
+    """
+    def __init__(self, game):
+        self.game = game
+        # Light -> None, a dict so releasing is O(1) while lights keep the order they were created in
+        self.lights = {}
+
+    def create(self, pos, size, color):
+        light = Light(self.game, pos, size, color)
+        self.lights[light] = None
+        return light
+
+    def release(self, light):
+        self.lights.pop(light, None)
+
+    def __len__(self):
+        return len(self.lights)
+
+    def __iter__(self):
+        return iter(self.lights)
+
+    def visible(self, view, offset=(0, 0)):
+        """
+        :param view: Screen rect to cull against.
+        :return: The lights whose mask overlaps the view with this offset.
+        """
+        return [light for light in self.lights if light.rect(offset).colliderect(view)]
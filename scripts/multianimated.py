@@ -51,12 +51,15 @@ class MultiAnimated:
         """
         Render the current animation frame at each tile position, 
         but ONLY if that tile is near the player.
+
+        :return: Number of tiles blitted.
         """
 
-        current_img = self.animation.img()
+        current_img = self.animation.img(self.flip)
         player_tile_x = self.game.player.pos[0] // self.game.tilemap.tile_size
         player_tile_y = self.game.player.pos[1] // self.game.tilemap.tile_size
 
+        blits = 0
         for (tx, ty) in self.positions:
             # Same proximity checks as in your Animated.render
             if (tx // self.game.tilemap.tile_size > player_tile_x - 14 and
@@ -69,7 +72,6 @@ class MultiAnimated:
                 x_pos = (tx - offset[0] + self.anim_offset[0])
                 y_pos = (ty - offset[1] + self.anim_offset[1])
 
-                surf.blit(
-                    pygame.transform.flip(current_img, self.flip, False),
-                    (x_pos, y_pos)
-                )
\ No newline at end of file
+                surf.blit(current_img, (x_pos, y_pos))
+                blits += 1
+        return blits
\ No newline at end of file
@@ -1,33 +1,216 @@
-import pygame
 import random
-import json
+import numpy as np
 
-class Particle:
-    def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0):
-        self.game = game
+from scripts.spatial_hash import SpatialHash
+
+# Particle types, a particle's type is its index in here
+PARTICLE_TYPES = ['torch_particle', 'smoke_particle', 'soul_particle']
+TORCH, SMOKE, SOUL = range(len(PARTICLE_TYPES))
+
+# Most particles alive at once, new ones are dropped while the pool is full
+MAX_PARTICLES = 2048
+
+# Smoke is drawn see through
+SMOKE_ALPHA = 80
+
+# Emitters only spawn while they are within this many pixels of the camera
+EMITTER_MARGIN = 64
+EMITTER_CELL_SIZE = 128
+
+
+class ParticleEmitter:
+    """
+    A spot that keeps spawning one type of particle (a torch's embers, a bonfire's smoke, a soul drop's wisps).
+    """
+    def __init__(self, p_type, rect, chance, velocity=(0, 0), spread=(0, 0), budget=16):
+        """
+        :param rect: Area particles spawn in, in world pixels.
+        :param chance: Chance to spawn a particle each tick.
+        :param velocity: Velocity of the particles.
+        :param spread: Random amount (up to +-) added to each component of the velocity.
+        :param budget: Most particles of this emitter alive at once.
+        """
         self.type = p_type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.assets['particles/' + p_type].copy()
-        self.frame = frame 
-        # Start the animation at the randomized frame
-        self.animation.frame = self.frame * self.animation.img_duration
+        self.rect = rect
+        self.chance = chance
+        self.velocity = velocity
+        self.spread = spread
+        self.budget = budget
+        # Particles of this emitter currently alive, kept by the ParticleSystem it is added to
+        self.live = 0
+        self.id = None
+
+
+class ParticleSystem:
+    """
+    Every live particle of the level, stored in parallel NumPy arrays (position, velocity, animation frame, type).
+
+    Particles play their type's animation once and are removed the tick after it finishes. Updating moves, animates,
+    jitters and expires all of them with a handful of array operations, rendering is a single Surface.blits call.
+    Live particles are kept packed at the front of the arrays in the order they were added, which is the order they
+    are drawn in.
+
+    Emitters are kept in a spatial hash and only the ones near the camera spawn, each up to its own budget, so the
+    particle count follows what is on screen rather than how many torches the level has.
+    """
+    def __init__(self, game, capacity=MAX_PARTICLES):
+        self.game = game
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int32)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.done = np.zeros(capacity, dtype=bool)
+        # Id of the emitter that spawned each particle, -1 for none
+        self.owner = np.full(capacity, -1, dtype=np.int32)
+        self.emitters = SpatialHash(cell_size=EMITTER_CELL_SIZE)
+        # Emitter id -> emitter, for handing back the budget of expired particles
+        self.emitter_ids = {}
+        self.next_emitter_id = 0
+        # Jitter has its own generator, seeded from random so seeded games stay reproducible
+        self.rng = np.random.default_rng(random.getrandbits(32))
+
+        # Every type's frames back to back, a particle draws images[first_image[type] + frame // img_duration[type]]
+        self.images = []
+        first_image, image_count, img_duration = [], [], []
+        for p_type in PARTICLE_TYPES:
+            animation = game.assets['particles/' + p_type]
+            images = animation.images
+            if p_type == 'smoke_particle':
+                images = [img.copy() for img in images]
+                for img in images:
+                    img.set_alpha(SMOKE_ALPHA)
+            first_image.append(len(self.images))
+            image_count.append(len(images))
+            img_duration.append(animation.img_duration)
+            self.images += images
+        self.first_image = np.array(first_image)
+        self.image_count = np.array(image_count)
+        self.img_duration = np.array(img_duration)
+        # Frame the animation stops on, same as a non looping Animation
+        self.last_frame = self.image_count * self.img_duration - 1
+        self.half_size = np.array([(img.get_width() // 2, img.get_height() // 2) for img in self.images])
+        self.max_size = (max(img.get_width() for img in self.images), max(img.get_height() for img in self.images))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, p_type, pos, velocity=(0, 0), frame=0, emitter=None):
+        """
+        :param p_type: One of PARTICLE_TYPES.
+        :param frame: Animation image to start on.
+        :param emitter: Emitter the particle counts against.
+        :return: False if the pool is full and the particle was dropped.
+        """
+        if self.count >= self.capacity:
+            return False
+        i = self.count
+        type_index = PARTICLE_TYPES.index(p_type)
+        self.pos[i] = pos
+        self.velocity[i] = velocity
+        self.frame[i] = frame * self.img_duration[type_index]
+        self.type[i] = type_index
+        self.done[i] = False
+        self.owner[i] = -1
+        if emitter is not None:
+            self.owner[i] = emitter.id
+            emitter.live += 1
+        self.count += 1
+        return True
+
+    def clear(self):
+        self.count = 0
+        for emitter in self.emitter_ids.values():
+            emitter.live = 0
+
+    def add_emitter(self, emitter):
+        emitter.id = self.next_emitter_id
+        self.next_emitter_id += 1
+        self.emitter_ids[emitter.id] = emitter
+        self.emitters.insert(emitter, emitter.rect)
+        return emitter
+
+    def remove_emitter(self, emitter):
+        """
+        Stop an emitter, the particles it already spawned play out.
+        """
+        self.emitters.remove(emitter)
+        self.emitter_ids.pop(emitter.id, None)
+
+    def emit(self, view):
+        """
+        Let the emitters near the view spawn this tick's particles.
+
+        :param view: The camera rect, in world pixels.
+        """
+        area = view.inflate(EMITTER_MARGIN * 2, EMITTER_MARGIN * 2)
+        for emitter in self.emitters.query_rect(area):
+            if emitter.live >= emitter.budget or not emitter.rect.colliderect(area):
+                continue
+            if random.random() < emitter.chance:
+                rect = emitter.rect
+                pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
+                velocity = list(emitter.velocity)
+                if emitter.spread[0] or emitter.spread[1]:
+                    velocity[0] += random.uniform(-emitter.spread[0], emitter.spread[0])
+                    velocity[1] += random.uniform(-emitter.spread[1], emitter.spread[1])
+                self.add(emitter.type, pos, velocity, frame=random.randint(0, 10), emitter=emitter)
 
     def update(self):
-        kill = False
-        if self.animation.done:
-            kill = True
+        n = self.count
+        if not n:
+            return
+        pos, frame, types, done = self.pos[:n], self.frame[:n], self.type[:n], self.done[:n]
+
+        # Particles whose animation had already finished go this tick
+        kill = done.copy()
+
+        pos += self.velocity[:n]
+
+        frame[~done] += 1
+        last_frame = self.last_frame[types]
+        finished = ~done & (frame >= last_frame)
+        frame[finished] = last_frame[finished]
+        done |= finished
 
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
+        # Embers wander, smoke drifts sideways now and then, souls sway
+        torch = np.flatnonzero(types == TORCH)
+        pos[torch] += np.sin(self.rng.random((len(torch), 2))) * 0.3
+        smoke = np.flatnonzero(types == SMOKE)
+        pos[smoke, 0] += np.sin(self.rng.random(len(smoke))) * 0.7 * self.rng.integers(-1, 2, len(smoke))
+        soul = np.flatnonzero(types == SOUL)
+        pos[soul, 0] += np.sin(self.rng.uniform(-1, 1, len(soul)))
 
-        self.animation.update()
+        if kill.any():
+            # Hand the expired particles' budget back to their emitters
+            owners = self.owner[:n][kill]
+            owners, counts = np.unique(owners[owners >= 0], return_counts=True)
+            for owner, count in zip(owners.tolist(), counts.tolist()):
+                emitter = self.emitter_ids.get(owner)
+                if emitter is not None:
+                    emitter.live -= count
 
-        return kill
+            keep = np.flatnonzero(~kill)
+            self.count = len(keep)
+            for array in (self.pos, self.velocity, self.frame, self.type, self.done, self.owner):
+                array[:self.count] = array[keep]
 
     def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        if 'smoke' in self.type:
-            img.set_alpha(80) 
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2, self.pos[1] - offset[1] - img.get_height() // 2))
+        """
+        :return: Number of particles blitted.
+        """
+        n = self.count
+        if not n:
+            return 0
+        types = self.type[:n]
+        image = self.first_image[types] + np.minimum(self.frame[:n] // self.img_duration[types], self.image_count[types] - 1)
+        blit_pos = self.pos[:n] - offset - self.half_size[image]
 
+        # Only particles that can touch the surface are blitted
+        width, height = surf.get_size()
+        on_screen = np.flatnonzero((blit_pos[:, 0] > -self.max_size[0]) & (blit_pos[:, 0] < width) &
+                                   (blit_pos[:, 1] > -self.max_size[1]) & (blit_pos[:, 1] < height))
+        images = self.images
+        surf.blits([(images[i], pos) for i, pos in zip(image[on_screen].tolist(), blit_pos[on_screen].tolist())], doreturn=False)
+        return len(on_screen)
@@ -0,0 +1,189 @@
+import heapq
+import math
+from collections import deque, OrderedDict
+
+# Up, down, left, right in (row, col)
+ORTHOGONAL_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Diagonal moves in (row, col), only used when diagonal movement is enabled
+DIAGONAL_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+DIAGONAL_COST = math.sqrt(2)
+
+# Returned by PathCache.get for queries that are not cached, as None is a cacheable 'no path' result
+MISSING = object()
+
+
+def build_flow_field(physics_tilemap, target, max_distance=None):
+    """
+    Reverse BFS over a physics tilemap from a (row, col) target tile.
+
+    :param physics_tilemap: 2D list where 1 marks an impassable tile.
+    :param target: The (row, col) tile distances are measured to.
+    :param max_distance: Stop expanding past this path distance, None for the whole map.
+    :return: Flat list (index = row * width + col) of path distances to the target, -1 for tiles not reached.
+    """
+    rows, cols = len(physics_tilemap), len(physics_tilemap[0])
+    distances = [-1] * (rows * cols)
+    distances[target[0] * cols + target[1]] = 0
+    queue = deque([target])
+    while queue:
+        row, col = queue.popleft()
+        distance = distances[row * cols + col] + 1
+        if max_distance is not None and distance > max_distance:
+            continue
+        for direction in ORTHOGONAL_DIRECTIONS:
+            new_row, new_col = row + direction[0], col + direction[1]
+            if (0 <= new_row < rows and 0 <= new_col < cols and
+                    distances[new_row * cols + new_col] == -1 and physics_tilemap[new_row][new_col] != 1):
+                distances[new_row * cols + new_col] = distance
+                queue.append((new_row, new_col))
+    return distances
+
+
+class AStar:
+    """
+    A* pathfinder over a physics tilemap with a bounded search.
+
+    Nodes are flat integer ids (row * width + col). The cost and parent arrays are allocated once for the map
+    and reused between queries, a per-node query stamp marks which entries belong to the current search.
+    """
+    def __init__(self, physics_tilemap, max_expansions=1024, max_radius=32, diagonal=False):
+        self.physics_tilemap = physics_tilemap
+        self.rows = len(physics_tilemap)
+        self.cols = len(physics_tilemap[0]) if physics_tilemap else 0
+        self.max_expansions = max_expansions
+        self.max_radius = max_radius
+        self.diagonal = diagonal
+        self.costs = [0.0] * (self.rows * self.cols)
+        self.parents = [-1] * (self.rows * self.cols)
+        self.stamps = [0] * (self.rows * self.cols)
+        self.closed = [0] * (self.rows * self.cols)
+        self.query = 0
+        self.expansions = 0
+
+    def heuristic(self, row, col, goal_row, goal_col, diagonal):
+        d_row = abs(row - goal_row)
+        d_col = abs(col - goal_col)
+        if diagonal:
+            # Octile distance
+            return d_row + d_col + (DIAGONAL_COST - 2) * min(d_row, d_col)
+        return d_row + d_col
+
+    def find_path(self, start, goal, max_expansions=None, max_radius=None, diagonal=None):
+        """
+        Find a path between two (row, col) tiles.
+
+        :param start: The (row, col) tile to start from, it may be impassable if an entity is standing over its edge.
+        :param goal: The (row, col) tile to reach, always enterable.
+        :param max_expansions: Maximum number of nodes to expand before giving up, defaults to the pathfinder's budget.
+        :param max_radius: Maximum distance in tiles (on either axis) from the start a path may go, None for unbounded.
+        :param diagonal: Allow diagonal moves, defaults to the pathfinder's setting.
+        :return: List of (row, col) tiles from start to goal, or None if no path was found within the budget.
+        """
+        max_expansions = self.max_expansions if max_expansions is None else max_expansions
+        max_radius = self.max_radius if max_radius is None else max_radius
+        diagonal = self.diagonal if diagonal is None else diagonal
+        rows, cols = self.rows, self.cols
+        if not (0 <= start[0] < rows and 0 <= start[1] < cols and 0 <= goal[0] < rows and 0 <= goal[1] < cols):
+            return None
+        if max_radius is not None and max(abs(goal[0] - start[0]), abs(goal[1] - start[1])) > max_radius:
+            return None
+
+        self.query += 1
+        query = self.query
+        costs, parents, stamps, closed = self.costs, self.parents, self.stamps, self.closed
+        physics_tilemap = self.physics_tilemap
+        directions = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS if diagonal else ORTHOGONAL_DIRECTIONS
+
+        start_id = start[0] * cols + start[1]
+        goal_id = goal[0] * cols + goal[1]
+        costs[start_id] = 0.0
+        parents[start_id] = -1
+        stamps[start_id] = query
+        # Heap entries are (f, h, node), equal f ties go to the node closest to the goal so open areas don't flood
+        start_h = self.heuristic(start[0], start[1], goal[0], goal[1], diagonal)
+        open_heap = [(start_h, start_h, start_id)]
+        self.expansions = 0
+
+        while open_heap:
+            _, _, node = heapq.heappop(open_heap)
+            if closed[node] == query:
+                continue
+            closed[node] = query
+            cost = costs[node]
+
+            if node == goal_id:
+                path = []
+                while node != -1:
+                    path.append(divmod(node, cols))
+                    node = parents[node]
+                path.reverse()
+                return path
+
+            self.expansions += 1
+            if self.expansions > max_expansions:
+                return None
+
+            row, col = divmod(node, cols)
+            for d_row, d_col in directions:
+                new_row, new_col = row + d_row, col + d_col
+                if not (0 <= new_row < rows and 0 <= new_col < cols):
+                    continue
+                if max_radius is not None and (abs(new_row - start[0]) > max_radius or abs(new_col - start[1]) > max_radius):
+                    continue
+                new_id = new_row * cols + new_col
+                if new_id != goal_id and physics_tilemap[new_row][new_col] == 1:
+                    continue
+                if d_row and d_col:
+                    # No cutting corners past impassable tiles
+                    if physics_tilemap[row][new_col] == 1 or physics_tilemap[new_row][col] == 1:
+                        continue
+                    new_cost = cost + DIAGONAL_COST
+                else:
+                    new_cost = cost + 1
+                if closed[new_id] == query or (stamps[new_id] == query and costs[new_id] <= new_cost):
+                    continue
+                stamps[new_id] = query
+                costs[new_id] = new_cost
+                parents[new_id] = node
+                new_h = self.heuristic(new_row, new_col, goal[0], goal[1], diagonal)
+                heapq.heappush(open_heap, (new_cost + new_h, new_h, new_id))
+
+        return None
+
+
+class PathCache:
+    """
+    Least recently used cache of found paths keyed by (start, goal, map revision).
+
+    Paths are stored as tuples and handed out as fresh lists, callers are free to consume them.
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, start, goal, revision):
+        """
+        :return: A copy of the cached path (None if the query found no path), or MISSING if the query is not cached.
+        """
+        key = (start, goal, revision)
+        if key not in self.paths:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        self.paths.move_to_end(key)
+        path = self.paths[key]
+        return None if path is None else list(path)
+
+    def put(self, start, goal, revision, path):
+        key = (start, goal, revision)
+        self.paths[key] = None if path is None else tuple(path)
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.max_size:
+            self.paths.popitem(last=False)
+
+    def clear(self):
+        self.paths.clear()
@@ -0,0 +1,155 @@
+import pygame
+import time
+import json
+import csv
+from collections import deque
+
+# Frame budget at 60 FPS
+FRAME_BUDGET_MS = 1000 / 60
+
+# Colors the overlay graph draws each phase in, phases not listed get grey
+PHASE_COLORS = {
+    'entities': (220, 60, 60),
+    'objects': (220, 140, 60),
+    'projectiles': (230, 200, 60),
+    'weather': (120, 200, 240),
+    'particles': (200, 120, 230),
+    'render_list': (140, 220, 100),
+    'sort': (60, 160, 60),
+    'tiles': (100, 100, 220),
+    'animated': (60, 200, 200),
+    'sorted_blits': (240, 240, 240),
+    'weather_render': (80, 140, 200),
+    'lights': (250, 230, 120),
+    'particles_render': (160, 80, 200),
+    'ui': (250, 150, 200),
+    'events': (150, 150, 100),
+    'scale': (90, 200, 150),
+    'flip': (200, 200, 120),
+    'idle': (50, 50, 50),
+}
+
+# Frames kept in the trace dumped to disk, about 10 minutes at 60 FPS
+MAX_TRACE_FRAMES = 36000
+
+
+class Profiler:
+    """
+    Per-frame wall time of each game loop phase plus counters, with a rolling graph overlay and CSV/JSON trace dumps.
+
+    Phases are timed lap style: mark(phase) charges the time since the previous mark to that phase. Every call
+    returns straight away while the profiler is disabled.
+    """
+    def __init__(self, history=240, enabled=False):
+        self.enabled = enabled
+        self.history = deque(maxlen=history)
+        self.trace = deque(maxlen=MAX_TRACE_FRAMES)
+        self.frame = 0
+        self.phases = {}
+        self.counters = {}
+        self.last_mark = None
+        self.frame_start = None
+        self.font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.last_mark = None
+        self.frame_start = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.phases = {}
+        self.counters = {}
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled or self.last_mark is None:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def count(self, counter, amount=1):
+        if not self.enabled:
+            return
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        record = {
+            'frame': self.frame,
+            'total_ms': (time.perf_counter() - self.frame_start) * 1000,
+            'phases': self.phases,
+            'counters': self.counters,
+        }
+        self.history.append(record)
+        self.trace.append(record)
+        self.frame += 1
+        self.last_mark = None
+        self.frame_start = None
+
+    def averages(self):
+        """
+        :return: Dict of each phase's mean ms over the rolling history.
+        """
+        totals = {}
+        for record in self.history:
+            for phase, ms in record['phases'].items():
+                totals[phase] = totals.get(phase, 0) + ms
+        return {phase: total / len(self.history) for phase, total in totals.items()}
+
+    def render(self, surf, pos=(8, 8), size=(240, 100)):
+        """
+        Draw the rolling stacked phase graph with the 16.6 ms budget line, the phase averages and the last counters.
+        """
+        if not self.enabled or not self.history:
+            return
+        if self.font is None:
+            self.font = pygame.font.Font(None, 16)
+        width, height = size
+        # Graph spans two frame budgets
+        ms_per_px = FRAME_BUDGET_MS * 2 / height
+        overlay = pygame.Surface(size, pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 160))
+        bar_width = max(1, width // self.history.maxlen)
+        for i, record in enumerate(self.history):
+            x = i * bar_width
+            y = height
+            for phase, ms in record['phases'].items():
+                bar_height = ms / ms_per_px
+                y -= bar_height
+                pygame.draw.rect(overlay, PHASE_COLORS.get(phase, (128, 128, 128)), (x, y, bar_width, max(1, bar_height + 1)))
+        budget_y = height - FRAME_BUDGET_MS / ms_per_px
+        pygame.draw.line(overlay, (255, 60, 60), (0, budget_y), (width, budget_y))
+        surf.blit(overlay, pos)
+
+        last = self.history[-1]
+        lines = [f'frame {last["total_ms"]:.1f} ms']
+        for phase, ms in sorted(self.averages().items(), key=lambda item: -item[1]):
+            lines.append(f'{phase} {ms:.2f}')
+        lines.append(' '.join(f'{counter} {value}' for counter, value in last['counters'].items()))
+        for i, line in enumerate(lines):
+            color = PHASE_COLORS.get(line.split(' ')[0], (255, 255, 255))
+            surf.blit(self.font.render(line, True, color), (pos[0] + width + 6, pos[1] + i * 12))
+
+    def dump(self, path):
+        """
+        Write the recorded trace, as CSV (one row per frame) if the path ends in .csv, otherwise as JSON.
+        """
+        records = list(self.trace)
+        if path.endswith('.csv'):
+            phases = sorted({phase for record in records for phase in record['phases']})
+            counters = sorted({counter for record in records for counter in record['counters']})
+            with open(path, 'w', newline='') as trace_file:
+                writer = csv.writer(trace_file)
+                writer.writerow(['frame', 'total_ms'] + [phase + '_ms' for phase in phases] + counters)
+                for record in records:
+                    writer.writerow([record['frame'], round(record['total_ms'], 4)] +
+                                    [round(record['phases'].get(phase, 0), 4) for phase in phases] +
+                                    [record['counters'].get(counter, 0) for counter in counters])
+        else:
+            with open(path, 'w') as trace_file:
+                json.dump({'frame_budget_ms': FRAME_BUDGET_MS, 'frames': records}, trace_file)
+        return path
@@ -1,7 +1,6 @@
 import pygame
 import math
 import json
-from scripts.light import Light
 
 class Projectile:
     def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0, size=None):
@@ -30,7 +29,7 @@ class Projectile:
         return kill
 
     def check_collision(self):
-        for enemy in self.game.enemies:
+        for enemy in self.game.enemy_hash.query_rect(self.rect()):
             if enemy.damage_rect().colliderect(self.rect()):
                 knockback_vector = [enemy.pos[0] - self.pos[0], enemy.pos[1] - self.pos[1]]
                 enemy.apply_knockback(knockback_vector, knockback_strength=5)
@@ -39,6 +38,7 @@ class Projectile:
         return False
             
     def rect(self):
+        self.game.profiler.count('rects')
         return pygame.Rect(
             self.pos[0] - self.size[0] // 2,
             self.pos[1] - self.size[1] // 2,
@@ -70,15 +70,13 @@ class FireballSpell(Projectile):
         self.light = None
 
     def update(self):
-        if self.light in self.game.lights:
-            self.game.lights.remove(self.light)
         if self.exploding:
             self.explosion_duration -= 1
             if self.explosion_duration <= 0:
+                self.game.lights.release(self.light)
                 return True  # End the fireball after the explosion
             self.animation.update()
-            self.light = Light(self.game, (self.pos[0]- 8, self.pos[1]- 8), 25, [50, 20, 0])
-            self.game.lights.append(self.light)
+            self.update_light(25)
             self.check_explosion_collision()
             return False
         
@@ -95,17 +93,23 @@ class FireballSpell(Projectile):
             return False
 
         self.animation.update()
-        self.light = Light(self.game, (self.pos[0]- 8, self.pos[1]- 8), 20, [50, 20, 0])
-        self.game.lights.append(self.light)
+        self.update_light(20)
         return False
 
+    def update_light(self, size):
+        # The fireball's light is created once and follows it from then on
+        if self.light is None:
+            self.light = self.game.lights.create((self.pos[0]- 8, self.pos[1]- 8), size, [50, 20, 0])
+        else:
+            self.light.move((self.pos[0]- 8, self.pos[1]- 8), size)
+
     def explode(self):
         self.exploding = True
         self.animation = self.game.assets['fireballspell_impact'].copy()
         self.size = self.explosion_hitbox_size
 
     def check_explosion_collision(self):
-        for enemy in self.game.enemies:
+        for enemy in self.game.enemy_hash.query_rect(self.rect()):
             if enemy not in self.damaged_entities and enemy.damage_rect().colliderect(self.rect()):
                 # Calculate knockback based on the center of the explosion and enemy
                 explosion_center = [self.pos[0], self.pos[1]]
@@ -127,7 +131,7 @@ class FireballSpell(Projectile):
             self.damaged_entities.append(self.game.player)
 
     def check_collision(self):
-        for enemy in self.game.enemies:
+        for enemy in self.game.enemy_hash.query_rect(self.rect()):
             if enemy.damage_rect().colliderect(self.rect()):
                 if not self.exploding:
                     enemy.health -= self.explosion_damage 
@@ -138,6 +142,7 @@ class FireballSpell(Projectile):
         return False
 
     def rect(self):
+        self.game.profiler.count('rects')
         if not self.exploding:
             return pygame.Rect(
                 self.pos[0] - self.size[0] // 2,
@@ -154,8 +159,8 @@ class FireballSpell(Projectile):
             )
 
     def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, self.vertical_flip), 
+        img = self.animation.img(self.flip, self.vertical_flip)
+        surf.blit(img, 
                   (self.pos[0] - offset[0] - img.get_width() // 2, 
                    self.pos[1] - offset[1] - img.get_height() // 2))
 
@@ -0,0 +1,102 @@
+class SpatialHash:
+    """
+    Uniform grid of buckets for broad phase collision queries between dynamic objects.
+
+    Every object is registered with a rect and stored in each cell the rect overlaps. Query results keep the
+    order objects were inserted in, so they match iterating the original object list.
+    """
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        # (cell x, cell y): {object: None}, dicts keep the buckets ordered and removal O(1)
+        self.cells = {}
+        # object: (insertion order, (first cell x, first cell y, last cell x, last cell y))
+        self.objects = {}
+        self.inserted = 0
+
+    def cell_range(self, rect):
+        return (
+            int(rect.left // self.cell_size),
+            int(rect.top // self.cell_size),
+            int((rect.right - 1) // self.cell_size),
+            int((rect.bottom - 1) // self.cell_size),
+        )
+
+    def insert(self, obj, rect):
+        """
+        Register an object, or move it if it is already registered.
+
+        :param obj: The object to register, must be hashable.
+        :param rect: The pygame.Rect covering the object.
+        """
+        if obj in self.objects:
+            self.move(obj, rect)
+            return
+        cell_range = self.cell_range(rect)
+        self.objects[obj] = (self.inserted, cell_range)
+        self.inserted += 1
+        self.add_to_cells(obj, cell_range)
+
+    def move(self, obj, rect):
+        """
+        Update a registered object's rect, buckets are only touched when it crosses a cell boundary.
+        """
+        if obj not in self.objects:
+            self.insert(obj, rect)
+            return
+        order, old_range = self.objects[obj]
+        cell_range = self.cell_range(rect)
+        if cell_range == old_range:
+            return
+        self.remove_from_cells(obj, old_range)
+        self.add_to_cells(obj, cell_range)
+        self.objects[obj] = (order, cell_range)
+
+    def remove(self, obj):
+        if obj in self.objects:
+            self.remove_from_cells(obj, self.objects.pop(obj)[1])
+
+    def clear(self):
+        self.cells.clear()
+        self.objects.clear()
+
+    def add_to_cells(self, obj, cell_range):
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                if (cx, cy) not in self.cells:
+                    self.cells[(cx, cy)] = {}
+                self.cells[(cx, cy)][obj] = None
+
+    def remove_from_cells(self, obj, cell_range):
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.pop(obj, None)
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    def query_rect(self, rect):
+        """
+        Get the objects registered in the cells a rect overlaps.
+
+        This is a broad phase, callers still test the exact rects.
+
+        :param rect: The pygame.Rect to query.
+        :return: List of objects in insertion order.
+        """
+        cell_range = self.cell_range(rect)
+        found = set()
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        if len(found) < 2:
+            return list(found)
+        return sorted(found, key=lambda obj: self.objects[obj][0])
+
+    def __contains__(self, obj):
+        return obj in self.objects
+
+    def __len__(self):
+        return len(self.objects)
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import pygame
+
+from scripts.utils import scale
+
+# Characters of the digit and letter glyph sets, in the order of their images
+DIGITS = '0123456789'
+LETTERS = 'abcdefghijklmnopqrstuvwxyz_:'
+
+# Runs each font keeps, least recently used go first, HUD numbers change all game long so it can't grow forever
+MAX_CACHED_RUNS = 128
+
+
+class BitmapFont:
+    """
+    Text drawn with one image per character (the digit and letter glyph sets) at a fixed advance.
+
+    A string is rendered into a single colorkeyed surface once per size and spacing and then blitted as one image,
+    so text that doesn't change between frames costs one blit instead of one scale and blit per character. The runs
+    are cached on the font and go away with it.
+    """
+    def __init__(self, glyphs, charset, max_runs=MAX_CACHED_RUNS):
+        """
+        :param glyphs: List of glyph images, all the same size.
+        :param charset: String of the character each glyph draws, in glyph order.
+        :param max_runs: Most rendered runs kept.
+        """
+        self.glyphs = dict(zip(charset, glyphs))
+        self.glyph_size = glyphs[0].get_size()
+        self.max_runs = max_runs
+        # (text, size, spacing) -> rendered run, least recently used first
+        self.runs = OrderedDict()
+
+    def render(self, text, size=None, spacing=1):
+        """
+        :param size: Size to scale each glyph to, None for the glyphs' own size.
+        :param spacing: Pixels between glyphs.
+        :return: The text as a surface with a black colorkey, shared between callers so don't draw on it.
+        """
+        key = (text, size, spacing)
+        run = self.runs.get(key)
+        if run is not None:
+            self.runs.move_to_end(key)
+            return run
+
+        glyph_width, glyph_height = size or self.glyph_size
+        advance = glyph_width + spacing
+        run = pygame.Surface((max(len(text) * advance - spacing, 0), glyph_height))
+        run.set_colorkey((0, 0, 0))
+        for i, char in enumerate(text):
+            glyph = self.glyphs[char]
+            run.blit(scale(glyph, size) if size else glyph, (i * advance, 0))
+        self.runs[key] = run
+        if len(self.runs) > self.max_runs:
+            self.runs.popitem(last=False)
+        return run
+
+    def render_right(self, surf, text, pos, size=None, spacing=1):
+        """
+        Draw text right aligned, pos being the top right corner of the text.
+        """
+        run = self.render(text, size, spacing)
+        surf.blit(run, (pos[0] - run.get_width(), pos[1]))
@@ -1,8 +1,11 @@
 import pygame
 import pytmx
-import copy
+import bisect
 import sys
+import os
 import json
+from scripts.pathfinding import AStar, PathCache, build_flow_field, ORTHOGONAL_DIRECTIONS, MISSING
+from scripts.level_format import CompiledLevel, compiled_path, is_up_to_date
 
 # 9 Nearby tiles
 NEIGHBORS_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
@@ -85,13 +88,86 @@ NON_ORDER_TILES = {
     'bridge',
     }
 
+# Path distance (in tiles) the player flow field is expanded to, enemies further out fall back to A*
+FLOW_FIELD_RADIUS = 24
+
+# Level loaded when no path is given
+DEFAULT_LEVEL = './levels/test_level_3/test_level_3.tmx'
+
+# Tiles that get a Light, gathered at load
+LIGHT_TILES = [('light', 0), ('torch', 0)]
+
+# Size (in tiles) of the pre-rendered surfaces used for the static non-ordered layers
+CHUNK_SIZE = 16
+
 # INTRERACTABLE_TILE_TYPES = {'ladder'}
 
+class TileGrid:
+    """
+    Flat grid of per-cell tile lists indexed by y * width + x.
+
+    Also usable like the old 'x;y' string keyed dict, with (x, y) tuple keys.
+    """
+    __slots__ = ('width', 'height', 'cells')
+
+    def __init__(self, width=0, height=0):
+        self.width = width
+        self.height = height
+        self.cells = [None] * (width * height)
+
+    def cell(self, x, y):
+        """
+        Get the tiles at a tile location.
+
+        :return: The list of tiles, or an empty tuple if there are none or the location is off the map.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[y * self.width + x] or ()
+        return ()
+
+    def add(self, x, y, tile):
+        index = y * self.width + x
+        if self.cells[index] is None:
+            self.cells[index] = []
+        self.cells[index].append(tile)
+
+    def keys(self):
+        return [(index % self.width, index // self.width) for index, tiles in enumerate(self.cells) if tiles]
+
+    def values(self):
+        return [tiles for tiles in self.cells if tiles]
+
+    def items(self):
+        return [((index % self.width, index // self.width), tiles) for index, tiles in enumerate(self.cells) if tiles]
+
+    def get(self, loc, default=None):
+        return self.cell(loc[0], loc[1]) or default
+
+    def __contains__(self, loc):
+        return bool(self.cell(loc[0], loc[1]))
+
+    def __getitem__(self, loc):
+        tiles = self.cell(loc[0], loc[1])
+        if not tiles:
+            raise KeyError(loc)
+        return tiles
+
+    def __delitem__(self, loc):
+        if not (0 <= loc[0] < self.width and 0 <= loc[1] < self.height):
+            raise KeyError(loc)
+        self.cells[loc[1] * self.width + loc[0]] = None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.values())
+
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.tile_size = tile_size
         self.game = game
-        self.tilemap = {}
+        self.tilemap = TileGrid()
         self.tilemap_layer_data_values = {}
         # Dict used for drawable objects, animated objects, and large objects (larger than 16x16) rendered in y-sort order
         self.object_layers = {
@@ -116,114 +192,159 @@ class Tilemap:
             'torch' : {'positions': [], 'variants': []},
         }
 
+        # Pre-rendered chunks of the NON_ORDER_TILES layers, keyed by tile type then chunk location
+        self.chunks = {}
+        self.dirty_chunks = set()
+
+        # Y-sorted tiles bucketed by tile row, each row held as parallel (x positions, tiles) lists sorted by x
+        self.ordered_rows = {}
+
+        # Per-cell collision rects (index = y * width + x) resolved at load for 'entity' and 'projectile' queries
+        self.entity_physics_rects = []
+        self.projectile_physics_rects = []
+
+        # (row, col) tile each entity last occupied, and the entities occupying each tile
+        self.entity_cells = {}
+        self.occupied_cells = {}
+
+        # Path distances to the player's tile (index = row * width + col, -1 if unreachable), shared by every pursuing enemy
+        self.player_flow_field = None
+        self.player_flow_field_target = None
+        self.player_flow_field_revision = None
+
+        # Bounded A* over the physics tilemap for queries outside the player flow field
+        self.pathfinder = None
+
+        # Bumped whenever the walkability of the physics tilemap changes, cached paths from older revisions are never served
+        self.revision = 0
+        self.path_cache = PathCache()
+
         self.offgrid_tiles = []
         self.player_position = (0, 0)
         self.enemy_positions = []
         self.boss_positions = []
         self.trees = []
+        # Light tiles ({'type', 'pos'} with pos in pixels), main turns them into Light objects
+        self.lights = []
+        self.tmx_data = None
         self.current_level = None
 
-    def load(self):
-        # Load the map tilemap
-        self.tmx_data = pytmx.load_pygame('./levels/test_level_3/test_level_3.tmx')
-        self.current_level = 'test_level_3'
+    def load(self, path=DEFAULT_LEVEL):
+        """
+        Load a level, from its compiled level file if there is an up to date one, otherwise from the TMX.
+        """
+        self.current_level = os.path.splitext(os.path.basename(path))[0]
+        if is_up_to_date(path):
+            self.load_compiled(compiled_path(path))
+        else:
+            self.load_tmx(path)
 
-        # create dictionary with key = layer names and values an array on integers in the data
-        for layer_index, layer in enumerate(self.tmx_data.visible_layers):
-            self.tilemap_layer_data_values.update({layer.name:[]})
+        self.build_chunks()
+        self.build_ordered_rows()
+        self.build_physics_rects()
 
-        # Add integer values of each layer into corresponding layer       
-        for layer_index, layer in enumerate(self.tmx_data.visible_layers):
-            for x, y , surf in layer.tiles():
-                if layer.data[y][x] not in self.tilemap_layer_data_values[layer.name]:
-                    self.tilemap_layer_data_values[layer.name].append(layer.data[y][x])
+        self.pathfinder = AStar(self.physics_tilemap)
+        self.revision += 1
+        self.path_cache.clear()
 
-        for layer_index, layer in enumerate(self.tmx_data.visible_layers):
-            for x, y , surf in layer.tiles():
-                if layer.data[y][x] not in self.tilemap_layer_data_values[layer.name]:
-                    self.tilemap_layer_data_values[layer.name].append(layer.data[y][x])
+    def load_tmx(self, path):
+        # Load the map tilemap
+        self.tmx_data = pytmx.load_pygame(path)
+
+        # A tile's variant is the index its gid first appeared at (row by row) in its layer, gids are numbered as they are
+        # met and looked up in a per-layer gid -> variant dict so the whole load stays linear in the number of tiles
+        self.tilemap_layer_data_values = {}
+        self.tilemap_layer_variants = {}
+        for layer in self.tmx_data.visible_layers:
+            self.tilemap_layer_data_values.setdefault(layer.name, [])
+            self.tilemap_layer_variants.setdefault(layer.name, {})
+
+        self.tilemap = TileGrid(self.tmx_data.width, self.tmx_data.height)
+        self.temp_object_layers = {k: {'positions': [], 'variants': []} for k in self.object_layers}
+        self.temp_animated_layers = {k: {'positions': [], 'variants': []} for k in self.animated_layers}
 
-        self.temp_object_layers = copy.deepcopy(self.object_layers)
-        self.temp_animated_layers = copy.deepcopy(self.animated_layers)
-        
-        # Match value within the layer to the variant that is the corresponding index of the layer
         for layer_index, layer in enumerate(self.tmx_data.visible_layers):
-            for x, y, surf in layer.tiles():
-                key = str(x) + ';' + str(y)
-                if key not in self.tilemap:
-                    self.tilemap[key] = []
-                if layer.data[y][x] != 0:
-                    if layer.data[y][x] in self.tilemap_layer_data_values[layer.name]:
-                        self.tilemap[key].append({'type': layer.name, 'variant': self.tilemap_layer_data_values[layer.name].index(layer.data[y][x]), 'pos': (x, y), 'layer': layer_index})
-                    for k in self.temp_object_layers:
-                        if layer.name == k:
-                            self.temp_object_layers[k]['positions'].append((x,y))
-                            self.temp_object_layers[k]['variants'].append(self.tilemap_layer_data_values[layer.name].index(layer.data[y][x]))
-                    for k in self.temp_animated_layers:
-                        if layer.name == k:
-                            self.temp_animated_layers[k]['positions'].append((x,y))
-                            self.temp_animated_layers[k]['variants'].append(self.tilemap_layer_data_values[layer.name].index(layer.data[y][x]))
-
-
-        # 2D array of physics tiles for the purpose of using a maze solving algo for pathfinding enemies to player
+            gids = self.tilemap_layer_data_values[layer.name]
+            variants = self.tilemap_layer_variants[layer.name]
+            # Object and animated layers also record every tile, the top left one decides which variant spawns objects
+            layer_objects = self.temp_object_layers.get(layer.name) or self.temp_animated_layers.get(layer.name)
+            for y, row in enumerate(layer.data):
+                for x, gid in enumerate(row):
+                    if gid == 0:
+                        continue
+                    variant = variants.get(gid)
+                    if variant is None:
+                        variant = variants[gid] = len(gids)
+                        gids.append(gid)
+                    self.tilemap.add(x, y, {'type': layer.name, 'variant': variant, 'pos': (x, y), 'layer': layer_index})
+                    if layer_objects is not None:
+                        layer_objects['positions'].append((x, y))
+                        layer_objects['variants'].append(variant)
+
+
+        # 2D array of static physics tiles for the purpose of using a maze solving algo for pathfinding enemies to player,
+        # the tiles occupied by entities are tracked separately in entity_cells / occupied_cells
         self.physics_tilemap = [[0 for x in range(self.tmx_data.width)] for y in range(self.tmx_data.height)]
-        for tile in self.tilemap:
-            negate_physics = None
-            for tile_types in self.tilemap[tile]:
-                if tile_types['type'] in NEGATE_PHYSICS_LAYERS:
-                    negate_physics = True
-            index = tile.find(';')
-            x = int(tile[:index])
-            y = int(tile[index+1:])
-            if tile_types['type'] in PHYSICS_TILE_TYPES and not negate_physics:
-                self.physics_tilemap[y][x] = 1
-            else:
-                self.physics_tilemap[y][x] = 0
+        for (x, y) in self.tilemap.keys():
+            self.update_physics_tile(x, y)
             
         physics_variants = self.get_top_left_most_variants(self.temp_object_layers)
         # TODO animation objects that are non-physics need to be rendered under player always
         animated_variants = self.get_top_left_most_variants(self.temp_animated_layers)
         
-        for k1 in self.temp_object_layers:
-            if physics_variants is not None:
-                for k2 in physics_variants:
-                    if k1 == k2:
-                        for i in range(0, len(self.temp_object_layers[k1]['variants'])):
-                            if physics_variants[k2][0] == self.temp_object_layers[k1]['variants'][i]:
-                                self.object_layers[k1]['positions'].append(self.temp_object_layers[k1]['positions'][i])
-        
-        for k1 in self.temp_animated_layers:
-            if animated_variants is not None:
-                for k2 in animated_variants:
-                    if k1 == k2:
-                        for i in range(0, len(self.temp_animated_layers[k1]['variants'])):
-                            if animated_variants[k2][0] == self.temp_animated_layers[k1]['variants'][i]:
-                                self.animated_layers[k1]['positions'].append(self.temp_animated_layers[k1]['positions'][i])
+        # Only the tiles with the top left tile's variant spawn objects
+        for k, variants in physics_variants.items():
+            layer = self.temp_object_layers[k]
+            self.object_layers[k]['positions'].extend(pos for pos, variant in zip(layer['positions'], layer['variants']) if variant == variants[0])
+
+        for k, variants in animated_variants.items():
+            layer = self.temp_animated_layers[k]
+            self.animated_layers[k]['positions'].extend(pos for pos, variant in zip(layer['positions'], layer['variants']) if variant == variants[0])
+
+        self.lights = [{'type': light['type'], 'pos': light['pos']} for light in self.extract(LIGHT_TILES, keep=True)]
+
+    def load_compiled(self, path):
+        """
+        Load a level compiled by helper_functions/level_compiler.py, skipping the TMX parse and every derived pass.
+        """
+        level = CompiledLevel(path)
+        self.tmx_data = None
+        self.tilemap_layer_data_values = {name: list(gids) for name, gids in level.variant_tables.items()}
+
+        width = level.width
+        self.tilemap = TileGrid(width, level.height)
+        cells = self.tilemap.cells
+        for layer_index, name in enumerate(level.layers):
+            for index, variant in zip(*level.layer(layer_index)):
+                tile = {'type': name, 'variant': variant, 'pos': (index % width, index // width), 'layer': layer_index}
+                if cells[index] is None:
+                    cells[index] = [tile]
+                else:
+                    cells[index].append(tile)
+
+        self.physics_tilemap = level.physics_tilemap()
+        for k in self.object_layers:
+            self.object_layers[k]['positions'] = level.positions('objects/' + k)
+        for k in self.animated_layers:
+            self.animated_layers[k]['positions'] = level.positions('animated/' + k)
+        self.lights = [{'type': light_type, 'pos': [x, y]} for x, y, light_type in level.lights()]
+        level.close()
             
-    def get_top_left_most_variants(self, dict):
-        top_left_positions = {}
+    def get_top_left_most_variants(self, layers):
+        """
+        :param layers: Dict of layer name to its tile 'positions' and matching 'variants'.
+        :return: Dict of layer name to a one item list holding the variant of the layer's top left most tile, layers without tiles are left out.
+        """
         top_left_variants = {}
-        for k in dict:
+        for k in layers:
             top_left_pos = None
-            for v in dict[k]:
-                if len(dict[k][v]) == 0:
-                    continue
-                if v != 'variants':
-                        for i in dict[k][v]:
-                            if top_left_pos == None:
-                                top_left_pos = i
-                            elif top_left_pos[1] > i[1]:
-                                top_left_pos = i
-                            elif top_left_pos[0] > i[0]:
-                                top_left_pos = i
-                        top_left_positions[k] = []
-                        top_left_positions[k].append(top_left_pos)
-                        top_left_index = dict[k][v].index(top_left_positions[k][0])
-                        top_left_variants[k] = []
-                        y = dict[k]['variants'][top_left_index]
-                        top_left_variants[k] = []
-                        top_left_variants[k].append(y)
-                                  
+            top_left_index = None
+            for i, pos in enumerate(layers[k]['positions']):
+                if top_left_pos is None or top_left_pos[1] > pos[1] or top_left_pos[0] > pos[0]:
+                    top_left_pos = pos
+                    top_left_index = i
+            if top_left_index is not None:
+                top_left_variants[k] = [layers[k]['variants'][top_left_index]]
         return top_left_variants
 
     def extract(self, id_pairs, keep=False):
@@ -234,8 +355,10 @@ class Tilemap:
                 if not keep:
                     self.offgrid_tiles.remove(tile)
 
+        walkability_changed = False
         for loc in list(self.tilemap.keys()):
-            for tile in self.tilemap[loc]:
+            tiles = self.tilemap[loc]
+            for tile in tiles.copy():
                 if (tile['type'], tile['variant']) in id_pairs:
                     match = tile.copy()
                     match['pos'] = list(match['pos'])
@@ -243,9 +366,19 @@ class Tilemap:
                     match['pos'][1] *= self.tile_size
                     matches.append(match)
                     if not keep:
-                        self.tilemap[loc].remove(tile)
-                        if not self.tilemap[loc]:  # Remove the key if the list is empty
-                            del self.tilemap[loc]
+                        if tile['type'] in NON_ORDER_TILES:
+                            self.dirty_chunks.add((tile['type'], (tile['pos'][0] // CHUNK_SIZE, tile['pos'][1] // CHUNK_SIZE)))
+                        else:
+                            self.remove_from_ordered_rows(tile)
+                        tiles.remove(tile)
+                        self.update_physics_rects(loc[0], loc[1])
+                        if self.update_physics_tile(loc[0], loc[1]):
+                            walkability_changed = True
+            if not tiles:  # Remove the key if the list is empty
+                del self.tilemap[loc]
+
+        if walkability_changed:
+            self.revision += 1
 
         return matches
 
@@ -311,9 +444,7 @@ class Tilemap:
         tiles = []
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
         for offset in NEIGHBORS_OFFSETS:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.extend(self.tilemap[check_loc])
+            tiles.extend(self.tilemap.cell(tile_loc[0] + offset[0], tile_loc[1] + offset[1]))
         return tiles
     
     def physics_rects_around(self, pos, entity_size, obj_type):
@@ -323,51 +454,74 @@ class Tilemap:
 
         :param pos: Position of the entity (x, y).
         :param entity_size: Size of the entity (width, height).
-        :return: List of pygame.Rect representing the physics collision boxes.
+        :param obj_type: 'entity' or 'projectile', projectiles pass over water and lava.
+        :return: List of the cached pygame.Rect physics collision boxes, these are shared so do not modify them.
         """
         rects = []
-        ignore_physics_rects = []
         # Calculate the number of tiles the entity covers
-        start_tile_x = int(pos[0] // self.tile_size) - 2
-        end_tile_x = int((pos[0] + entity_size[0]) // self.tile_size) + 2
-        start_tile_y = int(pos[1] // self.tile_size) - 2
-        end_tile_y = int((pos[1] + entity_size[1]) // self.tile_size) + 2
-
-        for x in range(start_tile_x, end_tile_x):
-            for y in range(start_tile_y, end_tile_y):
-                check_loc = f"{x};{y}"
-                if check_loc in self.tilemap:
-                    for tile in self.tilemap[check_loc]:
-                        if tile['type'] in NEGATE_PHYSICS_LAYERS:
-                            ignore_physics_rects.append((x, y))
+        start_tile_x = max(0, int(pos[0] // self.tile_size) - 2)
+        end_tile_x = min(self.tilemap.width, int((pos[0] + entity_size[0]) // self.tile_size) + 2)
+        start_tile_y = max(0, int(pos[1] // self.tile_size) - 2)
+        end_tile_y = min(self.tilemap.height, int((pos[1] + entity_size[1]) // self.tile_size) + 2)
 
+        cell_rects = self.projectile_physics_rects if obj_type == 'projectile' else self.entity_physics_rects
         for x in range(start_tile_x, end_tile_x):
             for y in range(start_tile_y, end_tile_y):
-                check_loc = f"{x};{y}"
-                if check_loc in self.tilemap:
-                    for tile in self.tilemap[check_loc]:
-                        if  (tile['type'] == 'water' or tile['type'] == 'lava') and obj_type == 'projectile': 
-                            continue
-                        if tile['type'] in PHYSICS_TILE_TYPES and (x, y) not in ignore_physics_rects:
-                            width, height = PHYSICS_TILE_HITBOXES.get(tile['type'], {}).get(tile['variant'], (self.tile_size, self.tile_size))
-                            if (tile['type'] == 'water' or tile['type'] == 'lava'): 
-                                rect = pygame.Rect(
-                                    tile['pos'][0] * self.tile_size + ((self.tile_size - width) / 2),
-                                    tile['pos'][1] * self.tile_size + ((self.tile_size - height) / 2) - 4,
-                                    width,
-                                    height
-                                )
-                            else:
-                                rect = pygame.Rect(
-                                    tile['pos'][0] * self.tile_size + ((self.tile_size - width) / 2),
-                                    tile['pos'][1] * self.tile_size + ((self.tile_size - height) / 2),
-                                    width,
-                                    height
-                                )
-                            rects.append(rect)
+                rects_at = cell_rects[y * self.tilemap.width + x]
+                if rects_at:
+                    rects.extend(rects_at)
         return rects
     
 
+    def build_physics_rects(self):
+        """
+        Resolve the collision rects of every cell once, separately for entity and projectile queries.
+        """
+        self.entity_physics_rects = [None] * (self.tilemap.width * self.tilemap.height)
+        self.projectile_physics_rects = [None] * (self.tilemap.width * self.tilemap.height)
+        for (x, y) in self.tilemap.keys():
+            self.update_physics_rects(x, y)
+
+    def update_physics_rects(self, x, y):
+        """
+        Recompute the cached collision rects of a single cell.
+        """
+        index = y * self.tilemap.width + x
+        self.entity_physics_rects[index] = None
+        self.projectile_physics_rects[index] = None
+
+        tiles = self.tilemap.cell(x, y)
+        for tile in tiles:
+            if tile['type'] in NEGATE_PHYSICS_LAYERS:
+                return
+
+        entity_rects = []
+        projectile_rects = []
+        for tile in tiles:
+            if tile['type'] in PHYSICS_TILE_TYPES:
+                width, height = PHYSICS_TILE_HITBOXES.get(tile['type'], {}).get(tile['variant'], (self.tile_size, self.tile_size))
+                if (tile['type'] == 'water' or tile['type'] == 'lava'):
+                    # Projectiles fly over water and lava
+                    entity_rects.append(pygame.Rect(
+                        x * self.tile_size + ((self.tile_size - width) / 2),
+                        y * self.tile_size + ((self.tile_size - height) / 2) - 4,
+                        width,
+                        height
+                    ))
+                else:
+                    rect = pygame.Rect(
+                        x * self.tile_size + ((self.tile_size - width) / 2),
+                        y * self.tile_size + ((self.tile_size - height) / 2),
+                        width,
+                        height
+                    )
+                    entity_rects.append(rect)
+                    projectile_rects.append(rect)
+        if entity_rects:
+            self.entity_physics_rects[index] = entity_rects
+        if projectile_rects:
+            self.projectile_physics_rects[index] = projectile_rects
+
     def bonfires_around(self, pos, player_size):
         nearby_bonfires = []
 
@@ -379,13 +533,11 @@ class Tilemap:
 
         for x in range(start_tile_x, end_tile_x):
             for y in range(start_tile_y, end_tile_y):
-                check_loc = f"{x};{y}"
-                if check_loc in self.tilemap:
-                    for tile in self.tilemap[check_loc]:
-                       # Check for bonfire object positions
-                        if tile['type'] == 'bonfire':
-                            if ((x,y)) in self.object_layers['bonfire']['positions']:
-                                nearby_bonfires.append((x * self.tile_size,y * self.tile_size))
+                for tile in self.tilemap.cell(x, y):
+                    # Check for bonfire object positions
+                    if tile['type'] == 'bonfire':
+                        if ((x,y)) in self.object_layers['bonfire']['positions']:
+                            nearby_bonfires.append((x * self.tile_size,y * self.tile_size))
 
         return nearby_bonfires
     
@@ -400,39 +552,142 @@ class Tilemap:
 
         for x in range(start_tile_x, end_tile_x):
             for y in range(start_tile_y, end_tile_y):
-                check_loc = f"{x};{y}"
-                if check_loc in self.tilemap:
-                    for tile in self.tilemap[check_loc]:
-                       # Check for bonfire object positions
-                        if tile['type'] == 'bronze_chest' or tile['type'] == 'silver_chest' or tile['type'] == 'gold_chest':
-                            if ((x,y)) in self.object_layers['bronze_chest']['positions'] or ((x,y)) in self.object_layers['silver_chest']['positions'] or ((x,y)) in self.object_layers['gold_chest']['positions']:
-                                nearby_chests.append((x * self.tile_size,y * self.tile_size))
+                for tile in self.tilemap.cell(x, y):
+                    # Check for chest object positions
+                    if tile['type'] == 'bronze_chest' or tile['type'] == 'silver_chest' or tile['type'] == 'gold_chest':
+                        if ((x,y)) in self.object_layers['bronze_chest']['positions'] or ((x,y)) in self.object_layers['silver_chest']['positions'] or ((x,y)) in self.object_layers['gold_chest']['positions']:
+                            nearby_chests.append((x * self.tile_size,y * self.tile_size))
         
         return nearby_chests
 
-    def insert_entity_into_physics_tilemap(self, pos, entity_type):
-        for i in range(0, len(self.physics_tilemap) - 1):
-            for j in range (0, len(self.physics_tilemap[i]) - 1):
-                if self.physics_tilemap[i][j] == 2 and entity_type == 'player':
-                    self.physics_tilemap[i][j] = 0
-                if self.physics_tilemap[i][j] == 3 and entity_type == 'enemy':
-                    self.physics_tilemap[i][j] = 0
-        if entity_type == 'enemy':
-            entity_x = int((pos[0] + 7) // self.tile_size)
-            entity_y = int((pos[1] + 4) // self.tile_size)
-        else:
-            entity_x = int((pos[0] + 7) // self.tile_size)
-            entity_y = int((pos[1] + 4) // self.tile_size)
-        # Handling for when player leaves tilemap
-        if entity_y > len(self.physics_tilemap) - 1:
-            return
-        if entity_x > len(self.physics_tilemap[entity_y]) - 1:
-            return
-        if entity_type == 'player':
-            self.physics_tilemap[entity_y][entity_x] = 2
-        else:
-            self.physics_tilemap[entity_y][entity_x] = 3
-        return self.physics_tilemap
+    def update_entity_occupancy(self, entity, pos):
+        """
+        Track the tile an entity occupies, only touching the cells it left and entered.
+
+        :param entity: The entity being tracked.
+        :param pos: Position of the entity (x, y).
+        :return: The (row, col) tile the entity occupies, or None if it is off the map.
+        """
+        row = int((pos[1] + 4) // self.tile_size)
+        col = int((pos[0] + 7) // self.tile_size)
+        # Handling for when entity leaves tilemap
+        if not (0 <= row < len(self.physics_tilemap) and 0 <= col < len(self.physics_tilemap[row])):
+            self.remove_entity_occupancy(entity)
+            return None
+        cell = (row, col)
+        if self.entity_cells.get(entity) != cell:
+            self.remove_entity_occupancy(entity)
+            self.entity_cells[entity] = cell
+            self.occupied_cells.setdefault(cell, []).append(entity)
+        return cell
+
+    def remove_entity_occupancy(self, entity):
+        cell = self.entity_cells.pop(entity, None)
+        if cell is not None:
+            self.occupied_cells[cell].remove(entity)
+            if not self.occupied_cells[cell]:
+                del self.occupied_cells[cell]
+
+    def entities_at(self, cell):
+        """
+        Get all entities occupying a (row, col) tile.
+        """
+        return self.occupied_cells.get(cell, [])
+
+    def update_physics_tile(self, x, y):
+        """
+        Recompute whether a tile blocks pathfinding from the tiles in its cell.
+
+        :return: True if the tile's walkability changed.
+        """
+        tiles = self.tilemap.cell(x, y)
+        negate_physics = False
+        for tile in tiles:
+            if tile['type'] in NEGATE_PHYSICS_LAYERS:
+                negate_physics = True
+        # The top tile of the cell decides if it blocks
+        blocked = 1 if tiles and tiles[-1]['type'] in PHYSICS_TILE_TYPES and not negate_physics else 0
+        changed = self.physics_tilemap[y][x] != blocked
+        self.physics_tilemap[y][x] = blocked
+        return changed
+
+    def get_player_flow_field(self):
+        """
+        Get the flow field towards the player, only recomputed when the player changes tile.
+        """
+        target = self.entity_cells.get(self.game.player)
+        if target is None:
+            return None
+        if target != self.player_flow_field_target or self.revision != self.player_flow_field_revision:
+            self.player_flow_field = build_flow_field(self.physics_tilemap, target, FLOW_FIELD_RADIUS)
+            self.player_flow_field_target = target
+            self.player_flow_field_revision = self.revision
+        return self.player_flow_field
+
+    def next_step_to_player(self, cell):
+        """
+        Get the neighbouring (row, col) tile one step closer to the player.
+
+        :param cell: The (row, col) tile to step from.
+        :return: The next tile, or None if the player is unreachable or already reached.
+        """
+        flow_field = self.get_player_flow_field()
+        if flow_field is None:
+            return None
+        rows, cols = len(self.physics_tilemap), len(self.physics_tilemap[0])
+        distance = flow_field[cell[0] * cols + cell[1]]
+        if distance == 0:
+            return None
+        best_step = None
+        best_distance = None
+        for direction in ORTHOGONAL_DIRECTIONS:
+            new_row, new_col = cell[0] + direction[0], cell[1] + direction[1]
+            if 0 <= new_row < rows and 0 <= new_col < cols:
+                new_distance = flow_field[new_row * cols + new_col]
+                # Entities standing over the edge of a physics tile are not in the field, step to the best neighbour instead
+                if new_distance != -1 and (best_distance is None or new_distance < best_distance):
+                    best_step = (new_row, new_col)
+                    best_distance = new_distance
+                    if distance != -1 and new_distance == distance - 1:
+                        break
+        return best_step
+
+    def find_path(self, start, goal):
+        """
+        Bounded A* search between two (row, col) tiles.
+
+        :return: List of (row, col) tiles from start to goal, or None if there is no path within the search budget.
+        """
+        if self.pathfinder is None:
+            return None
+        path = self.path_cache.get(start, goal, self.revision)
+        if path is MISSING:
+            path = self.pathfinder.find_path(start, goal)
+            self.path_cache.put(start, goal, self.revision, path)
+        return path
+
+    def path_to_player(self, start):
+        """
+        Follow the player flow field from a (row, col) tile, searching with A* when it is outside the field.
+
+        :return: List of (row, col) tiles from start to the player, or None if the player is unreachable.
+        """
+        if self.get_player_flow_field() is None:
+            return None
+        target = self.player_flow_field_target
+        path = self.path_cache.get(start, target, self.revision)
+        if path is not MISSING:
+            return path
+        path = [start]
+        step = self.next_step_to_player(start)
+        while step is not None:
+            path.append(step)
+            step = self.next_step_to_player(step)
+        if path[-1] != target:
+            # Outside the flow field
+            path = self.pathfinder.find_path(start, target)
+        self.path_cache.put(start, target, self.revision, path)
+        return path
                 
                 
     # def render(self, surf, offset=(0, 0)):
@@ -454,6 +709,129 @@ class Tilemap:
     #                     for tile in sorted(self.tilemap[loc], key=lambda t: t['layer']):
     #                         self.render_tile(surf, tile, offset)
 
+    def build_chunks(self):
+        """
+        Pre-render all static non-ordered tiles (ground, bridges) into CHUNK_SIZE x CHUNK_SIZE tile surfaces.
+        """
+        self.chunks = {tile_type: {} for tile_type in NON_ORDER_TILES}
+        self.dirty_chunks = set()
+        for tile in self.get_all_non_ordered_tiles():
+            self.dirty_chunks.add((tile['type'], (tile['pos'][0] // CHUNK_SIZE, tile['pos'][1] // CHUNK_SIZE)))
+        for tile_type, chunk_loc in self.dirty_chunks:
+            self.render_chunk(tile_type, chunk_loc)
+        self.dirty_chunks.clear()
+
+    def render_chunk(self, tile_type, chunk_loc):
+        """
+        (Re)build the cached surface for a single chunk of a non-ordered layer.
+
+        :param tile_type: The non-ordered tile type the chunk holds.
+        :param chunk_loc: The chunk location (x, y) in chunk units.
+        """
+        chunk_px = CHUNK_SIZE * self.tile_size
+        chunk = pygame.Surface((chunk_px, chunk_px))
+        chunk.set_colorkey((0, 0, 0))
+        has_tiles = False
+        for x in range(chunk_loc[0] * CHUNK_SIZE, (chunk_loc[0] + 1) * CHUNK_SIZE):
+            for y in range(chunk_loc[1] * CHUNK_SIZE, (chunk_loc[1] + 1) * CHUNK_SIZE):
+                for tile in self.tilemap.cell(x, y):
+                    if tile['type'] == tile_type:
+                        chunk.blit(
+                            self.game.assets[tile_type][tile['variant']],
+                            ((x - chunk_loc[0] * CHUNK_SIZE) * self.tile_size, (y - chunk_loc[1] * CHUNK_SIZE) * self.tile_size)
+                        )
+                        has_tiles = True
+        if has_tiles:
+            self.chunks[tile_type][chunk_loc] = chunk
+        else:
+            self.chunks[tile_type].pop(chunk_loc, None)
+
+    def render_chunks(self, surf, tile_type, offset=(0, 0)):
+        """
+        Render the cached chunks of a non-ordered layer that intersect the camera.
+
+        :param surf: The surface to render the chunks on.
+        :param tile_type: The non-ordered tile type to render.
+        :param offset: The offset to apply to the chunk positions.
+        :return: Number of chunks blitted.
+        """
+        chunk_px = CHUNK_SIZE * self.tile_size
+        blits = 0
+        for cx in range(offset[0] // chunk_px, (offset[0] + surf.get_width()) // chunk_px + 1):
+            for cy in range(offset[1] // chunk_px, (offset[1] + surf.get_height()) // chunk_px + 1):
+                if (tile_type, (cx, cy)) in self.dirty_chunks:
+                    self.dirty_chunks.discard((tile_type, (cx, cy)))
+                    self.render_chunk(tile_type, (cx, cy))
+                chunk = self.chunks[tile_type].get((cx, cy))
+                if chunk is not None:
+                    surf.blit(chunk, (cx * chunk_px - offset[0], cy * chunk_px - offset[1]))
+                    blits += 1
+        return blits
+
+    def build_ordered_rows(self):
+        """
+        Bucket every y-sorted tile drawn by render_tile into its tile row, sorted by x within the row.
+        """
+        self.ordered_rows = {}
+        for loc, tiles in self.tilemap.items():
+            for tile in tiles:
+                # Object and animated layers are rendered by their own objects, never by render_tile
+                if tile['type'] in NON_ORDER_TILES or tile['type'] in self.object_layers or tile['type'] in self.animated_layers:
+                    continue
+                self.ordered_rows.setdefault(tile['pos'][1], []).append(tile)
+        for row, tiles in self.ordered_rows.items():
+            tiles.sort(key=lambda tile: tile['pos'][0])
+            self.ordered_rows[row] = ([tile['pos'][0] for tile in tiles], tiles)
+
+    def remove_from_ordered_rows(self, tile):
+        if tile['pos'][1] not in self.ordered_rows:
+            return
+        xs, tiles = self.ordered_rows[tile['pos'][1]]
+        for i in range(len(tiles)):
+            if tiles[i] is tile:
+                del xs[i]
+                del tiles[i]
+                return
+
+    def render_queue(self, dynamic_objects, offset, view_size):
+        """
+        Build the y-sorted render queue for what is on screen.
+
+        :param dynamic_objects: List of (object, y) pairs for entities and other moving objects.
+        :param offset: The camera offset.
+        :param view_size: Size (width, height) of the surface being rendered to.
+        :return: List of (object, y) pairs sorted by y, tiles before objects on ties.
+        """
+        first_col = int(offset[0] // self.tile_size) - 1
+        last_col = int((offset[0] + view_size[0]) // self.tile_size) + 1
+        first_row = int(offset[1] // self.tile_size) - 1
+        last_row = int((offset[1] + view_size[1]) // self.tile_size) + 1
+
+        # Gather the visible tiles, already in y order since rows are walked top to bottom
+        visible_tiles = []
+        keys = []
+        for row in range(first_row, last_row + 1):
+            if row not in self.ordered_rows:
+                continue
+            xs, tiles = self.ordered_rows[row]
+            start = bisect.bisect_left(xs, first_col)
+            end = bisect.bisect_right(xs, last_col)
+            for tile in tiles[start:end]:
+                visible_tiles.append((tile, row * self.tile_size))
+                keys.append(row * self.tile_size)
+
+        # Merge in the dynamic objects
+        dynamic_objects.sort(key=lambda obj: obj[1])
+        queue = []
+        lo = 0
+        for obj in dynamic_objects:
+            index = bisect.bisect_right(keys, obj[1], lo)
+            queue.extend(visible_tiles[lo:index])
+            queue.append(obj)
+            lo = index
+        queue.extend(visible_tiles[lo:])
+        return queue
+
     def render_tile(self, surf, tile, offset):
         """
         Render a single tile on the given surface.
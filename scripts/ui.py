@@ -1,6 +1,8 @@
 import pygame
 import json
 
+from scripts.text import BitmapFont, DIGITS, LETTERS
+
 class UI:
     def __init__(self, game, player, equipped_player_weapon, equipped_player_spell,
                  base_position=(10, 0), base_size=(100, 50), 
@@ -22,6 +24,11 @@ class UI:
         self.blue_digits = game.assets['blue_digits']
         self.green_digits = game.assets['green_digits']
         self.grey_letters = game.assets['grey_letters']
+        self.grey_digit_font = BitmapFont(self.grey_digits, DIGITS)
+        self.red_digit_font = BitmapFont(self.red_digits, DIGITS)
+        self.blue_digit_font = BitmapFont(self.blue_digits, DIGITS)
+        self.green_digit_font = BitmapFont(self.green_digits, DIGITS)
+        self.grey_letter_font = BitmapFont(self.grey_letters, LETTERS)
         self.upgrade_arrow = game.assets['upgrade_arrow']
         self.upgrade_arrow_hover = game.assets['upgrade_arrow_hover']
         self.downgrade_arrow = game.assets['downgrade_arrow']
@@ -176,9 +183,6 @@ class UI:
     def render_souls(self, surf, player):
         # TODO Implement loop to render the increase so you can see it tick up on enemy kill instaed of instantly changing
 
-        # Shift for each digit rendering
-        left_shift = 0
-        
         # Max number that can be displayed on the soul counter card
         if player.souls > 9999999999:
             display_souls = "9999999999"
@@ -194,277 +198,65 @@ class UI:
         # Render the empty soul_counter_card
         surf.blit(self.soul_counter_card, soul_counter_card_postition)
 
-        # Empty string to hold the revered string of souls
-        reversed_display_souls = ""
-
-        # Reverse the string for rendering because we render left --> right in the soul_counter_card
-        for i in range(0, len(display_souls)):
-            reversed_display_souls += display_souls[len(display_souls)-i-1]
+        # Souls are right aligned in the soul_counter_card
+        self.grey_digit_font.render_right(surf, display_souls, (soul_counter_card_postition[0] + 43, soul_counter_card_postition[1] + 6))
 
-        # Loop through and print digits
-        for i in reversed_display_souls:
-            surf.blit(self.grey_digits[int(i)], (soul_counter_card_postition[0] + 40 - left_shift, soul_counter_card_postition[1] + 6))
-            left_shift += 4
+    def render_number(self, surf, font, value, pos, size, spacing):
+        """
+        Render a stat right aligned, capped at the most digits the menus have room for.
 
+        :param pos: Top left of the last digit.
+        """
+        display_value = "9999999999" if value > 9999999999 else str(value)
+        font.render_right(surf, display_value, (pos[0] + size[0], pos[1]), size, spacing)
 
+    def render_label(self, surf, text, pos, size, spacing=1):
+        """
+        :param pos: Top left of the last letter.
+        """
+        self.grey_letter_font.render_right(surf, text, (pos[0] + size[0], pos[1]), size, spacing)
 
-    # TODO Use a single function for all this rendering to fix readabillity
     def render_next_level(self, surf, level):
-        # Shift for each digit rendering
-        left_shift = 0
-        
-        # Max number that can be displayed on the soul counter card
-        display_souls = str(level* 100)
-
-
-        # Empty string to hold the revered string of souls
-        reversed_display_souls = ""
-
-        # Reverse the string for rendering because we render left --> right in the soul_counter_card
-        for i in range(0, len(display_souls)):
-            reversed_display_souls += display_souls[len(display_souls)-i-1]
-            
-        # Loop through and print digits
-        for i in reversed_display_souls:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 713, surf.get_height() - 587)), (485 - left_shift, 526))
-            left_shift += 9
+        self.render_number(surf, self.grey_digit_font, level * 100, (485, 526), (surf.get_width() - 713, surf.get_height() - 587), 2)
 
     def render_health(self, surf, player):
-        left_shift = 0
-
-        if player.max_health > 9999999999:
-            display_health = "9999999999"
-        else:
-            display_health = str(player.max_health)
-        
-        # Get screen size for rendering
-        screen_width, screen_height = surf.get_size()
-
-        reversed_display_health = ""
-
-        for i in range(0, len(display_health)):
-            reversed_display_health += display_health[len(display_health)-i-1]
-
-                # Loop through and print digits
-        for i in reversed_display_health:
-            pygame.transform.scale(self.red_digits[int(i)], surf.get_size())
-            # TODO draw out th rest of the upgrade screen and how we want it.
-            # How we will transform sizes of digits and shit
-            surf.blit(pygame.transform.scale(self.red_digits[int(i)], (surf.get_width() - 710, surf.get_height() - 585)), (420 - left_shift, 161))
-            left_shift += 12
+        # TODO draw out th rest of the upgrade screen and how we want it.
+        self.render_number(surf, self.red_digit_font, player.max_health, (420, 161), (surf.get_width() - 710, surf.get_height() - 585), 2)
 
     def render_stamina(self, surf, player):
-        left_shift = 0
-
-        if player.max_stamina > 9999999999:
-            display_stamina = "9999999999"
-        else:
-            display_stamina = str(player.max_stamina)
-        
-        # Get screen size for rendering
-        screen_width, screen_height = surf.get_size()
-
-        reversed_display_stamina = ""
-
-        for i in range(0, len(display_stamina)):
-            reversed_display_stamina += display_stamina[len(display_stamina)-i-1]
-
-                # Loop through and print digits
-        for i in reversed_display_stamina:
-            surf.blit(pygame.transform.scale(self.green_digits[int(i)], (surf.get_width() - 710, surf.get_height() - 585)), (420 - left_shift, 281))
-            left_shift += 12
+        self.render_number(surf, self.green_digit_font, player.max_stamina, (420, 281), (surf.get_width() - 710, surf.get_height() - 585), 2)
 
     def render_mana(self, surf, player):
-        left_shift = 0
-
-        if player.max_mana > 9999999999:
-            display_mana = "9999999999"
-        else:
-            display_mana = str(player.max_mana)
-        
-        # Get screen size for rendering
-        screen_width, screen_height = surf.get_size()
-
-        reversed_display_mana = ""
-
-        for i in range(0, len(display_mana)):
-            reversed_display_mana += display_mana[len(display_mana)-i-1]
-
-        # Loop through and print digits
-        for i in reversed_display_mana:
-            surf.blit(pygame.transform.scale(self.blue_digits[int(i)], (surf.get_width() - 710, surf.get_height() - 585)), (420 - left_shift, 401))
-            left_shift += 12
+        self.render_number(surf, self.blue_digit_font, player.max_mana, (420, 401), (surf.get_width() - 710, surf.get_height() - 585), 2)
 
     def render_weapon_name_stats(self, surf, player, weapon):
-        left_shift = 0
+        name_size = (surf.get_width() - 714, surf.get_height() - 591)
+        stat_size = (surf.get_width() - 716, surf.get_height() - 591)
 
-        temp_reversed_weapon_damage = str(weapon.damage)
-        reversed_weapon_damage = ""
-        for i in range(0, len(temp_reversed_weapon_damage)):
-            reversed_weapon_damage += temp_reversed_weapon_damage[len(temp_reversed_weapon_damage)-i-1]
-        
-        temp_reversed_weapon_cooldown = str(weapon.cooldown)
-        reversed_weapon_cooldown = ""
-        for i in range(0, len(temp_reversed_weapon_cooldown)):
-            reversed_weapon_cooldown += temp_reversed_weapon_cooldown[len(temp_reversed_weapon_cooldown)-i-1]
-
-        temp_reversed_weapon_stamina_cost = str(weapon.stamina_cost)
-        reversed_weapon_stamina_cost = ""
-        for i in range(0, len(temp_reversed_weapon_stamina_cost)):
-            reversed_weapon_stamina_cost += temp_reversed_weapon_stamina_cost[len(temp_reversed_weapon_stamina_cost)-i-1]
-
-        reversed_weapon_name = ""
-
-        for i in range(0, len(weapon.weapon_type)):
-            reversed_weapon_name += weapon.weapon_type[len(weapon.weapon_type)-i-1]
-
-        for i in reversed_weapon_name:
-            if i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 714, surf.get_height() - 591)), (565 - left_shift, 200))
-            left_shift += 7
-        
-        left_shift = 0
-
-        for i in ':egamad':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (515 - left_shift, 218))
-            left_shift += 5
-        
-        left_shift = 0
+        self.render_label(surf, weapon.weapon_type, (565, 200), name_size)
 
-        for i in reversed_weapon_damage:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 218))
-            left_shift += 5
+        self.render_label(surf, 'damage:', (515, 218), stat_size)
+        self.render_number(surf, self.grey_digit_font, weapon.damage, (585, 218), stat_size, 1)
 
-        left_shift = 0
-
-        for i in ':nwodlooc':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (525 - left_shift, 230))
-            left_shift += 5
-        left_shift = 0
-
-        for i in reversed_weapon_cooldown:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 230))
-            left_shift += 5
-
-        left_shift = 0
-
-        for i in ':tsoc_animats':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (545 - left_shift, 242))
-            left_shift += 5
-
-        left_shift = 0
-
-        for i in reversed_weapon_stamina_cost:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 242))
-            left_shift += 5
+        self.render_label(surf, 'cooldown:', (525, 230), stat_size)
+        self.render_number(surf, self.grey_digit_font, weapon.cooldown, (585, 230), stat_size, 1)
 
+        self.render_label(surf, 'stamina_cost:', (545, 242), stat_size)
+        self.render_number(surf, self.grey_digit_font, weapon.stamina_cost, (585, 242), stat_size, 1)
 
     def render_spell_name_stats(self, surf, player, spell):
-        left_shift = 0
+        name_size = (surf.get_width() - 714, surf.get_height() - 591)
+        stat_size = (surf.get_width() - 716, surf.get_height() - 591)
 
-        temp_reversed_spell_damage = str(spell.damage)
-        reversed_spell_damage = ""
-        for i in range(0, len(temp_reversed_spell_damage)):
-            reversed_spell_damage += temp_reversed_spell_damage[len(temp_reversed_spell_damage)-i-1]
-        
-        temp_reversed_spell_mana_cost = str(spell.mana_cost)
-        reversed_spell_mana_cost = ""
-        for i in range(0, len(temp_reversed_spell_mana_cost)):
-            reversed_spell_mana_cost+= temp_reversed_spell_mana_cost[len(temp_reversed_spell_mana_cost)-i-1]
-
-        temp_reversed_spell_velocity = str(spell.velocity)
-        reversed_spel_velocity = ""
-        for i in range(0, len(temp_reversed_spell_velocity)):
-            reversed_spel_velocity += temp_reversed_spell_velocity[len(temp_reversed_spell_velocity)-i-1]
-
-        reversed_spell_name = ""
-
-        for i in range(0, len(spell.spell_type)):
-            reversed_spell_name += spell.spell_type[len(spell.spell_type)-i-1]
-
-        for i in reversed_spell_name:
-            if i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 714, surf.get_height() - 591)), (565 - left_shift, 415))
-            left_shift += 7
-        
-        left_shift = 0
-
-        for i in ':egamad':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (515 - left_shift, 430))
-            left_shift += 5
-        
-        left_shift = 0
+        self.render_label(surf, spell.spell_type, (565, 415), name_size)
 
-        for i in reversed_spell_damage:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 430))
-            left_shift += 5
-        
-        left_shift = 0
-
-        for i in ':tsoc_anam':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (530 - left_shift, 442))
-            left_shift += 5
-
-        left_shift = 0
-
-        for i in reversed_spell_mana_cost:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 442))
-            left_shift += 5
-
-        left_shift = 0
-
-        for i in ':yticolev':
-            if i == ':':
-                index = 27
-            elif i == '_':
-                index = 26
-            else:
-                index = ord(i) - 97
-            surf.blit(pygame.transform.scale(self.grey_letters[int(index)], (surf.get_width() - 716, surf.get_height() - 591)), (525 - left_shift, 454))
-            left_shift += 5
-        
-        left_shift = 0
+        self.render_label(surf, 'damage:', (515, 430), stat_size)
+        self.render_number(surf, self.grey_digit_font, spell.damage, (585, 430), stat_size, 1)
 
-        for i in reversed_spel_velocity:
-            surf.blit(pygame.transform.scale(self.grey_digits[int(i)], (surf.get_width() - 716, surf.get_height() - 591)), (585 - left_shift, 454))
-            left_shift += 5
+        self.render_label(surf, 'mana_cost:', (530, 442), stat_size)
+        self.render_number(surf, self.grey_digit_font, spell.mana_cost, (585, 442), stat_size, 1)
 
+        self.render_label(surf, 'velocity:', (525, 454), stat_size)
+        self.render_number(surf, self.grey_digit_font, spell.velocity, (585, 454), stat_size, 1)
 
         # Render restoration if I end up doing anything with that
-        
\ No newline at end of file
@@ -1,15 +1,119 @@
 import pygame
 import re
 import os
+import posixpath
+import hashlib
 import copy
 import random
 import json
 
 BASE_IMG_PATH = "graphics/"
 
+# Atlas sheets and manifest written by helper_functions/atlas_packer.py
+ATLAS_PATH = BASE_IMG_PATH + "atlas/"
+ATLAS_MANIFEST_PATH = ATLAS_PATH + "manifest.json"
+
+# Set to check every packed image against its .png when the manifest is loaded, while editing graphics without
+# repacking. Off by default, the atlases are trusted as packed (helper_functions/atlas_packer.py --check does the same)
+CHECK_ATLAS_SOURCES = bool(os.environ.get('CHECK_ATLAS_SOURCES'))
+
+# Image path -> [atlas, x, y, width, height, source sha1], loaded on first use (empty if the atlases were never packed)
+atlas_manifest = None
+# Image paths whose .png changed since they were packed, only filled with CHECK_ATLAS_SOURCES
+atlas_stale = set()
+# Atlas name -> converted sheet surface, the atlas's images are copied out of it
+atlas_sheets = {}
+# Atlas name -> paths of its images not copied out yet, the sheet is dropped once none are left
+atlas_pending = {}
+# Atlas name -> Future of the decoded (not yet converted) sheet, see preload_atlases
+atlas_decodes = {}
+
+
+def get_atlas_entry(path):
+    global atlas_manifest
+    if atlas_manifest is None:
+        atlas_manifest = {}
+        atlas_pending.clear()
+        atlas_stale.clear()
+        if os.path.isfile(ATLAS_MANIFEST_PATH):
+            with open(ATLAS_MANIFEST_PATH) as manifest_file:
+                atlas_manifest = json.load(manifest_file)['images']
+        for image_path, entry in atlas_manifest.items():
+            atlas_pending.setdefault(entry[0], set()).add(image_path)
+        if CHECK_ATLAS_SOURCES:
+            atlas_stale.update(find_stale_atlas_images())
+            if atlas_stale:
+                print(f'{len(atlas_stale)} images changed since the atlases were packed and are loaded from their own '
+                      f'files, run helper_functions/atlas_packer.py')
+    return atlas_manifest.get(posixpath.normpath(path))
+
+
+def find_stale_atlas_images():
+    """
+    :return: Paths of the packed images whose .png no longer matches the hash recorded when packing. Images whose .png
+             is not there (only the atlases were shipped) are left out.
+    """
+    stale = []
+    for path, entry in atlas_manifest.items():
+        source = BASE_IMG_PATH + path
+        if not os.path.isfile(source):
+            continue
+        with open(source, 'rb') as source_file:
+            if len(entry) < 6 or hashlib.sha1(source_file.read()).hexdigest() != entry[5]:
+                stale.append(path)
+    return stale
+
+
+def get_atlas_sheet(atlas):
+    if atlas not in atlas_sheets:
+        if atlas in atlas_decodes:
+            sheet = atlas_decodes.pop(atlas).result()
+        else:
+            sheet = pygame.image.load(ATLAS_PATH + atlas + '.png')
+        # convert() needs the display, so it always happens on the main thread
+        atlas_sheets[atlas] = sheet.convert()
+    return atlas_sheets[atlas]
+
+
+def preload_atlases(executor):
+    """
+    Start decoding every atlas sheet that is not loaded yet on an executor's threads, biggest first as those take the
+    longest.
+    """
+    get_atlas_entry('')
+    areas = {}
+    for entry in atlas_manifest.values():
+        atlas, x, y, width, height = entry[:5]
+        areas[atlas] = areas.get(atlas, 0) + width * height
+    for atlas in sorted(areas, key=lambda atlas: -areas[atlas]):
+        if atlas not in atlas_sheets and atlas not in atlas_decodes:
+            atlas_decodes[atlas] = executor.submit(pygame.image.load, ATLAS_PATH + atlas + '.png')
+
+
+def release_atlas_sheets():
+    """
+    Drop the converted sheets still cached, e.g. once every asset is loaded. Images already copied out are unaffected.
+    """
+    atlas_sheets.clear()
+
 
 def load_image(path):
-    img = pygame.image.load(BASE_IMG_PATH + path).convert()
+    entry = get_atlas_entry(path)
+    if entry is not None:
+        atlas, x, y, width, height = entry[:5]
+        path = posixpath.normpath(path)
+        if path in atlas_stale:
+            img = pygame.image.load(BASE_IMG_PATH + path).convert()
+        else:
+            # Copied out rather than kept as a subsurface, pygame blits subsurfaces noticeably slower
+            img = get_atlas_sheet(atlas).subsurface((x, y, width, height)).copy()
+        # Every image is a copy, so the sheet is only worth keeping while some of its images haven't been loaded
+        pending = atlas_pending[atlas]
+        pending.discard(path)
+        if not pending:
+            atlas_sheets.pop(atlas, None)
+    else:
+        img = pygame.image.load(BASE_IMG_PATH + path).convert()
     img.set_colorkey((0, 0, 0))
     return img
 
@@ -18,24 +122,60 @@ def load_images(path):
 
     def extract_number(f):
         return int(re.search(r'(\d+)', f).group(0))
-    
-    img_names = sorted([f for f in os.listdir(BASE_IMG_PATH + path) if f.endswith('.png')],
-                       key=extract_number)
-    for img_name in img_names:
-        if img_name.endswith('.png'):
-            images.append(load_image(path + '/' + img_name).convert())
+
+    if os.path.isdir(BASE_IMG_PATH + path):
+        img_names = [f for f in os.listdir(BASE_IMG_PATH + path) if f.endswith('.png')]
+    else:
+        # Only the atlases were shipped
+        directory = posixpath.normpath(path)
+        get_atlas_entry(directory)
+        img_names = [posixpath.basename(f) for f in atlas_manifest if posixpath.dirname(f) == directory]
+    for img_name in sorted(img_names, key=extract_number):
+        images.append(load_image(path + '/' + img_name))
     return images
 
+# (image, flip x, flip y) -> flipped copy, see flip
+flipped_images = {}
+
+
+def flip(img, flip_x, flip_y):
+    """
+    pygame.transform.flip for long lived images (assets), each flipped copy is made once.
+
+    :return: The flipped copy, or the image itself if it isn't flipped either way.
+    """
+    if not (flip_x or flip_y):
+        return img
+    key = (img, bool(flip_x), bool(flip_y))
+    if key not in flipped_images:
+        flipped_images[key] = pygame.transform.flip(img, flip_x, flip_y)
+    return flipped_images[key]
+
+# (image, size) -> scaled copy, see scale
+scaled_images = {}
+
+
+def scale(img, size):
+    """
+    pygame.transform.scale for long lived images (assets), each size is scaled once.
+    """
+    key = (img, tuple(size))
+    if key not in scaled_images:
+        scaled_images[key] = pygame.transform.scale(img, size)
+    return scaled_images[key]
+
 class Animation:
-    def __init__ (self, images, img_dur=5, loop=True):
+    def __init__ (self, images, img_dur=5, loop=True, flipped=None):
         self.images = images
         self.img_duration = img_dur
         self.loop = loop
         self.done = False
         self.frame = 0
+        # (flip x, flip y) -> frames flipped so far (None until first used), shared by every copy of the animation
+        self.flipped = {} if flipped is None else flipped
 
     def copy(self):
-        return Animation(self.images, self.img_duration, self.loop)
+        return Animation(self.images, self.img_duration, self.loop, self.flipped)
     
     def update(self):
         if self.loop:
@@ -47,8 +187,17 @@ class Animation:
                     self.done = True
                     self.frame = len(self.images) * self.img_duration - 1
 
-    def img(self):
-        return self.images[int(self.frame) // self.img_duration]
-    
-
-
+    def img(self, flip_x=False, flip_y=False):
+        """
+        :return: The current frame, flipped copies come from the shared cache instead of being flipped every call.
+        """
+        index = int(self.frame) // self.img_duration
+        if not (flip_x or flip_y):
+            return self.images[index]
+        key = (bool(flip_x), bool(flip_y))
+        if key not in self.flipped:
+            self.flipped[key] = [None] * len(self.images)
+        frames = self.flipped[key]
+        if frames[index] is None:
+            frames[index] = pygame.transform.flip(self.images[index], flip_x, flip_y)
+        return frames[index]
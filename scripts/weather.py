@@ -31,8 +31,6 @@ class Weather:
         self.current_weather = initial_weather_type
         self.day_night_cycle_counter = 0
 
-        self.night_overlay = pygame.Surface(self.game.display.get_size(), pygame.SRCALPHA)
-
 
     def update(self):
         # Update the time for day/night cycle
@@ -80,10 +78,6 @@ class Weather:
             self.flash_surface.set_alpha(self.flash_alpha)
             surf.blit(self.flash_surface, (0, 0))
 
-        # Update the night overlay based on the current opacity
-        self.game.night_overlay.fill((0, 0, 0, self.night_overlay_opacity))
-        surf.blit(self.night_overlay, (0, 0))
-
     def start_transition(self, target_opacity):
         """Start transitioning from current opacity to the target opacity."""
         self.transitioning = True